@@ -0,0 +1,167 @@
+import datetime
+import glob
+import gzip
+import os
+import threading
+
+import polars as pl
+
+# --- SESSION ANALYTICS ---
+# Reads the archived event logs (archive_log_*.csv / .csv.gz / .parquet) back
+# into one columnar table and answers history queries from it.
+#
+# Each archive is converted once into <folder>/analytics/<archive>.parquet with
+# one row per logged transition and the seconds of each kind accrued until the
+# next row (deltas of the log's running counters, so paused time counts as
+# nothing). Later runs only convert archives that have no part file yet. The
+# parts are held in memory as a single DataFrame, and query results are cached
+# until an ingest actually adds rows.
+
+STORE_DIR = "analytics"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Log column -> seconds column in the store
+COUNTERS = {"Study": "study", "Phone": "phone", "Desk": "desk", "Slouch": "slouch", "Distracted": "distracted"}
+FOCUS_STATUS = "Studying"
+
+def archive_paths(folder):
+    paths = []
+    for pattern in ("archive_log_*.csv", "archive_log_*.csv.gz", "archive_log_*.parquet"):
+        paths.extend(glob.glob(os.path.join(folder, pattern)))
+    return sorted(paths)
+
+def read_archive(path):
+    if path.endswith(".parquet"): return pl.read_parquet(path)
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f: return pl.read_csv(f.read(), infer_schema_length=0)
+    # infer_schema_length=0 reads every column as text; typed below
+    return pl.read_csv(path, infer_schema_length=0)
+
+def to_intervals(df, archive):
+    # One row per transition, with the seconds accrued in each counter until the next row
+    if "Reason" not in df.columns: df = df.with_columns(pl.lit(None, dtype=pl.Utf8).alias("Reason"))
+    counters = [pl.col(src).cast(pl.Int64, strict=False) for src in COUNTERS]
+    df = df.select(
+        pl.col("Timestamp").cast(pl.Utf8).str.strptime(pl.Datetime, TIME_FORMAT, strict=False).alias("ts"),
+        pl.col("Status").cast(pl.Utf8).alias("status"),
+        pl.col("Reason").cast(pl.Utf8).alias("reason"),
+        *[c.alias(src) for c, src in zip(counters, COUNTERS)],
+    ).drop_nulls("ts")
+    return df.select(
+        pl.lit(archive).alias("archive"), "ts", "status", "reason",
+        # A counter that went backwards was reset by a new session: nothing accrued
+        *[(pl.col(src).shift(-1) - pl.col(src)).clip(lower_bound=0).fill_null(0).alias(dst)
+          for src, dst in COUNTERS.items()],
+    )
+
+def parse_date(value):
+    if value is None or isinstance(value, datetime.datetime): return value
+    return datetime.datetime.fromisoformat(value)
+
+class HistoryStore:
+    def __init__(self, log_folder):
+        self.log_folder = log_folder
+        self.store_dir = os.path.join(log_folder, STORE_DIR)
+        self.lock = threading.Lock()
+        self.table = None
+        self.ingested = set()
+        self.version = 0
+        self.cache = {}
+
+    def part_path(self, archive):
+        return os.path.join(self.store_dir, os.path.basename(archive).split(".")[0] + ".parquet")
+
+    def ingest(self):
+        # Cheap when nothing is new: one directory listing. Returns rows added.
+        with self.lock:
+            if self.table is None: self._load_parts()
+            new_parts = []
+            for path in archive_paths(self.log_folder):
+                name = os.path.basename(path).split(".")[0]
+                if name in self.ingested: continue
+                try:
+                    part = to_intervals(read_archive(path), name)
+                except Exception as e:
+                    print(f"⚠️ Analytics: skipping {path}: {e}")
+                    self.ingested.add(name)
+                    continue
+                os.makedirs(self.store_dir, exist_ok=True)
+                part.write_parquet(self.part_path(path))
+                self.ingested.add(name)
+                new_parts.append(part)
+            if not new_parts: return 0
+            self.table = pl.concat([self.table, *new_parts]).sort("ts", maintain_order=True)
+            self.version += 1
+            self.cache.clear()
+            return sum(len(p) for p in new_parts)
+
+    def _load_parts(self):
+        parts = sorted(glob.glob(os.path.join(self.store_dir, "*.parquet")))
+        if parts:
+            self.table = pl.concat([pl.read_parquet(p) for p in parts]).sort("ts", maintain_order=True)
+            self.ingested = set(self.table["archive"].unique().to_list())
+        else:
+            self.table = pl.DataFrame(schema={"archive": pl.Utf8, "ts": pl.Datetime, "status": pl.Utf8, "reason": pl.Utf8,
+                                              **{dst: pl.Int64 for dst in COUNTERS.values()}})
+        # Archives that produced an empty part still count as done
+        self.ingested.update(os.path.basename(p)[:-len(".parquet")] for p in parts)
+
+    def window(self, since=None, until=None):
+        df = self.table
+        if since is not None: df = df.filter(pl.col("ts") >= parse_date(since))
+        if until is not None: df = df.filter(pl.col("ts") < parse_date(until))
+        return df
+
+    def cached(self, key, fn):
+        self.ingest()
+        with self.lock:
+            if key in self.cache: return self.cache[key]
+            result = fn()
+            self.cache[key] = result
+            return result
+
+    # --- QUERIES ---
+    def totals(self, since=None, until=None, every="1d"):
+        # Seconds per kind and phone pickups per period (every: "1d", "1w", "1mo", ...)
+        def run():
+            df = self.window(since, until)
+            out = (df.group_by(pl.col("ts").dt.truncate(every).alias("period"))
+                   .agg(*[pl.col(c).sum() for c in COUNTERS.values()],
+                        (pl.col("status") == "On Phone").sum().alias("phone_pickups"))
+                   .sort("period"))
+            return out.with_columns(pl.col("period").dt.strftime("%Y-%m-%d")).to_dicts()
+        return self.cached(("totals", since, until, every), run)
+
+    def longest_focus_streak(self, since=None, until=None):
+        # Longest unbroken run of "Studying" rows within one archive
+        def run():
+            df = self.window(since, until)
+            if df.is_empty(): return None
+            runs = df.with_columns(
+                ((pl.col("status") != pl.col("status").shift(1)) | (pl.col("archive") != pl.col("archive").shift(1)))
+                .fill_null(True).cum_sum().alias("run"))
+            best = (runs.filter(pl.col("status") == FOCUS_STATUS)
+                    .group_by("run").agg(pl.col("ts").min().alias("start"), pl.col("study").sum().alias("seconds"))
+                    .sort("seconds", descending=True).head(1))
+            if best.is_empty(): return None
+            row = best.row(0, named=True)
+            return {"start": row["start"].strftime(TIME_FORMAT), "seconds": row["seconds"]}
+        return self.cached(("streak", since, until), run)
+
+    def distraction_reasons(self, since=None, until=None):
+        def run():
+            df = self.window(since, until).filter(pl.col("status") == "Distracted")
+            out = (df.group_by(pl.col("reason").fill_null("Unknown").replace("", "Unknown"))
+                   .agg(pl.len().alias("count"), pl.col("distracted").sum().alias("seconds"))
+                   .sort("seconds", descending=True))
+            return out.to_dicts()
+        return self.cached(("reasons", since, until), run)
+
+    def summary(self, since=None, until=None, every="1d"):
+        # Raises ValueError for a bad date or period string
+        try:
+            return {"totals": self.totals(since, until, every),
+                    "longest_focus_streak": self.longest_focus_streak(since, until),
+                    "distraction_reasons": self.distraction_reasons(since, until),
+                    "rows": len(self.table), "version": self.version}
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(str(e))
@@ -1,15 +1,28 @@
-from flask import Flask, render_template, Response, jsonify, request
+from flask import Flask, render_template, Response, jsonify, request, abort
+import psutil
 import cv2
-from ultralytics import YOLO
-from Adafruit_IO import Client, RequestError
-import mediapipe as mp
 import time
-import sys
 import os
 import json
 import datetime
-import math
 import threading
+import atexit
+import argparse
+from detectors import DetectorPool, YoloBatcher, load_yolo, yolo_class_ids, warm_up_yolo, largest_person_box, head_roi, hands_roi, mp_drawing, mp_pose, mp_hands
+from scheduler import AdaptiveScheduler, MotionGate, DEFAULT_RELATIVE_RATES
+from tracker import BoxTracker
+from uploader import AioPublisher, make_transport
+from event_log import EventLogWriter
+from session_store import SessionStore
+from stats_store import StatsStore
+from frame_sources import CameraStream
+from video_stream import FrameBroadcaster
+from analytics import HistoryStore
+from startup import Startup
+from classifier import StatusClassifier, FeatureRecorder, class_confidences, feature_row, vectorize
+from metrics import Registry, RateMeter, SamplingProfiler
+from features import TickFeatures, extract_features
+from status_filter import StatusFilter
 
 app = Flask(__name__)
 
@@ -19,11 +32,22 @@ AIO_USERNAME = "groupproject5555"
 AIO_KEY = "aio_PHxo83cpnPXG4vmGlN62BKdmNu4O"
 # ▼▼▼ ----------------- ▼▼▼
 
-try:
-    aio = Client(AIO_USERNAME, AIO_KEY)
-    print("✅ Connected to Adafruit IO.")
-except Exception as e:
-    print(f"❌ Failed to connect to Adafruit IO: {e}")
+# "rest" (HTTP API) or "mqtt" (one persistent connection). Set AIO_HOST/AIO_PORT
+# to point either transport at a local broker instead of io.adafruit.com.
+AIO_TRANSPORT = "rest"
+AIO_HOST = None
+AIO_PORT = None
+
+# Slow setup runs in the background (see startup.py); /readyz reports progress.
+# Nothing is started at import time: start() (section 7) does it, so processes
+# that merely import this file - DETECTOR_MODE = "process" workers re-import the
+# main module on spawn platforms like macOS - load no models and open no files.
+startup = Startup()
+
+# Uploads happen on a background thread (see uploader.py), never on the frame loop.
+# The client is created there too, so it never holds up the first page.
+adafruit = None
+aio_publisher = None
 
 # Feeds
 FEED_STATUS = "devicestatus"
@@ -34,33 +58,71 @@ FEED_PERCENT_SLOUCH = "time-slouching"
 FEED_PERCENT_DISTRACTED = "time-distracted"
 
 # --- 2. CONFIG & VARIABLES ---
-# Robust Model Loading
-try:
-    model = YOLO("yolo11n.pt", task="detect")
-except Exception as e:
-    print(f"⚠️ Model load error: {e}. Attempting re-download.")
-    if os.path.exists("yolo11n.pt"): os.remove("yolo11n.pt")
-    model = YOLO("yolo11n.pt", task="detect")
-
-# --- MEDIAPIPE SETUP ---
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(max_num_hands=2, min_detection_confidence=0.5)
+# YOLO runtime: "pytorch", "onnx" (ONNX Runtime) or "openvino". Exports are cached
+# in models/ on first run. A smaller YOLO_IMGSZ (e.g. 320) trades range for speed.
+YOLO_BACKEND = "pytorch"
+YOLO_IMGSZ = 640
+YOLO_INT8 = False
+
+# Robust Model Loading (see detectors.py for the MediaPipe solutions), on a
+# background thread with one warm-up inference; workers wait for it in prepare()
+def load_model():
+    model = load_yolo("yolo11n.pt", backend=YOLO_BACKEND, imgsz=YOLO_IMGSZ, int8=YOLO_INT8)
+    # Only keep the classes the status logic actually reads
+    predict_args = {"imgsz": YOLO_IMGSZ, "classes": yolo_class_ids(model)}
+    warm_up_yolo(model, **predict_args)
+    return model, predict_args
+
+yolo = None
+
+# How the four detectors run each analysis tick: "thread", "process" or "serial"
+DETECTOR_MODE = "thread"
+# Adaptive scheduling (see scheduler.py): analysis ticks/s to aim for, and how many
+# CPU seconds per second all detectors together may use before cadence is stretched
+ANALYSIS_TARGET_RATE = 8.0
+ANALYSIS_CPU_BUDGET = 1.0
+# Motion gate: mean grey-level change (0-255) below which a still scene reuses the
+# previous detections, and the longest we go without a forced refresh
+MOTION_THRESHOLD = 4.0
+MOTION_REFRESH_INTERVAL = 5.0
+# Box tracking (see tracker.py): YOLO runs on keyframes at this fraction of the
+# analysis rate and tracked boxes are carried between them by optical flow;
+# uncertain tracks or motion around the person pull the next YOLO run forward,
+# and live tracks count towards the status decision alongside the detections
+TRACKER_ENABLED = True
+YOLO_KEYFRAME_RATE = 0.5
 
 # ⚠️ CALIBRATION
 SLOUCH_THRESHOLD = 0.15 
 GAZE_THRESHOLD_LEFT = 0.40  
 GAZE_THRESHOLD_RIGHT = 0.60 
 
+# Status smoothing: hysteresis margins around the thresholds above, and how long
+# (seconds) a new status must persist before it is committed
+STATUS_SMOOTHING = True
+SLOUCH_HYSTERESIS = 0.02
+GAZE_HYSTERESIS = 0.03
+STATUS_MIN_DWELL = 1.0
+PHONE_MIN_DWELL = 0.5
+
+# Status decision: "rules" (the priority chain in analyze()) or the path of a
+# model trained with classifier.py. FEATURE_LOG records every tick's features
+# for training; POST /label {"label": "Studying"} tags the rows while recording.
+STATUS_CLASSIFIER = "rules"
+FEATURE_LOG = False
+FEATURE_LOG_FOLDER = os.path.join("logs", "features")
+
 LOG_FOLDER = "logs"
 SAVE_FILE = "current_session_save.json"
 CURRENT_LOG_FILE = "current_log.csv"
 
-if not os.path.exists(LOG_FOLDER): os.makedirs(LOG_FOLDER)
+# Buffered event log (see event_log.py). Archives: "csv", "csv.gz" or "parquet"
+LOG_FSYNC = "flush"
+LOG_ARCHIVE_FORMAT = "csv"
+
+# Set up by start()
+status_classifier = None
+feature_recorder = None
 
 # Default Stats
 default_stats = {
@@ -73,354 +135,852 @@ default_stats = {
     "away_time": 0.0,
     "hands_detected": False 
 }
-stats = default_stats.copy()
-is_running = False
 
-# --- 3. HELPER FUNCTIONS ---
-def save_state_to_json():
-    try:
-        with open(SAVE_FILE, 'w') as f: json.dump(stats, f)
-    except Exception as e: print(f"⚠️ Save failed: {e}")
+# --- 3. SEATS ---
+# One process can watch several desks. Each seat has its own camera, worker,
+# stats, session file, event log and feed names; the YOLO model is shared and,
+# with more than one seat, batched across them (see YoloBatcher). The MediaPipe
+# solutions stay per seat because they track landmarks between frames.
+class Seat:
+    def __init__(self, seat_id, source, log_folder=LOG_FOLDER, save_file=SAVE_FILE, feed_prefix=""):
+        self.seat_id = seat_id
+        self.source = source
+        self.feed_prefix = feed_prefix
+        # Written by the worker, read lock-free by everyone else (see stats_store.py)
+        self.stats = StatsStore(default_stats)
+        self.is_running = False
+        self.label = None           # ground truth for feature logging, set via /label
+        self.broadcaster = FrameBroadcaster(VIDEO_JPEG_QUALITY, on_encode=m_encode_latency.observe)
+        self.stats_channel = StatsBroadcaster()
+        self.camera = None
+        self.camera_lock = threading.Lock()
+        self.worker = None
+        self.lock = threading.Lock()
+
+        if not os.path.exists(log_folder): os.makedirs(log_folder)
+        self.event_log = EventLogWriter(log_folder, CURRENT_LOG_FILE, fsync=LOG_FSYNC, archive_format=LOG_ARCHIVE_FORMAT)
+        # Snapshot + delta journal, written off the frame thread (see session_store.py)
+        self.session_store = SessionStore(save_file)
+        # Query engine over this seat's archived logs (see analytics.py)
+        self.history = HistoryStore(log_folder)
+        # Exported as this seat's study_capture_fps / study_analysis_fps
+        self.capture_rate = RateMeter()
+        self.analysis_rate = RateMeter()
+        m_capture_fps.labels(seat=seat_id).fn = self.capture_rate.rate
+        m_analysis_fps.labels(seat=seat_id).fn = self.analysis_rate.rate
+
+    def feed(self, name):
+        return self.feed_prefix + name
+
+    def save(self):
+        self.session_store.checkpoint(self.stats.snapshot())
+
+    def load(self):
+        stats, resumed = self.session_store.load(default_stats)
+        self.stats.reset(stats)
+        if resumed: print(f"📂 [{self.seat_id}] Loaded previous session data: {stats}")
+
+    def log(self, status, reason=""):
+        # Buffered; the writer thread does the actual file I/O
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.stats.lock:
+            s = self.stats.values
+            self.event_log.log([now, status, int(s['study_time']), int(s['phone_time']), int(s['desk_time']), int(s['slouch_time']), int(s['distracted_time']), reason])
+
+    def archive(self):
+        self.event_log.rotate()
+        self.session_store.clear()
+
+    # Starting a session starts tracking, whether or not a browser is showing the video.
+    # Each action holds the stats lock, so the worker sees all of it or none of it.
+    def continue_session(self):
+        with self.stats.lock:
+            self.load()
+            self.reset_filter()
+            self.is_running = True
+            self.log("SESSION RESUMED")
+        self.ensure_worker()
+        self.stats_channel.publish(self.stats.snapshot(), force=True)
+
+    def new_session(self):
+        with self.stats.lock:
+            # History credits each row with the time until the next one, so the old
+            # session needs a closing row with its final counters before it is archived
+            self.log("SESSION ENDED")
+            self.archive()
+            self.stats.reset()
+            self.reset_filter()
+            self.is_running = True
+            self.save()
+            self.log("NEW SESSION STARTED")
+        self.ensure_worker()
+        self.stats_channel.publish(self.stats.snapshot(), force=True)
+
+    def stop_session(self):
+        with self.stats.lock:
+            self.is_running = False
+            self.save()
+            self.log("SESSION PAUSED")
+        self.stats_channel.publish(self.stats.snapshot(), force=True)
+
+    def reset_filter(self):
+        # Votes cast before a pause or in the last session shouldn't pick the first status
+        worker = self.worker
+        if worker and worker.status_filter: worker.status_filter.reset()
+
+    def ensure_worker(self):
+        # Returns None while the shared model is down: a worker could only fail again
+        # (/readyz shows why), and every retry would reopen the camera
+        if yolo is None or yolo.state == "failed": return None
+        with self.lock:
+            if self.worker is None:
+                self.worker = AnalysisWorker(self).start()
+        return self.worker
+
+    def open_camera(self):
+        # Camera component factory: only succeeds once the source has opened and
+        # delivered a frame, so a dead source shows up as failed in /readyz. The
+        # stream is stored on the seat right away, so nothing is left running
+        # unowned if the worker gives up before collecting it.
+        with self.camera_lock:
+            if self.camera and not self.camera.stopped: return self.camera
+            stream = CameraStream(self.source)
+            if not stream.stream.isOpened():
+                stream.stop()
+                raise RuntimeError(f"could not open source {self.source!r}")
+            stream.start()
+            if stream.wait_for_frame(0, timeout=CAMERA_START_TIMEOUT) is None:
+                stream.stop()
+                raise RuntimeError(f"no frame from {self.source!r} within {CAMERA_START_TIMEOUT:.0f} s")
+            self.camera = stream
+            return stream
 
-def load_previous_state():
-    global stats
-    if os.path.exists(SAVE_FILE):
-        try:
-            with open(SAVE_FILE, 'r') as f:
-                loaded_data = json.load(f)
-            stats = default_stats.copy()
-            stats.update(loaded_data)
-            print(f"📂 Loaded previous session data: {stats}")
-        except Exception as e:
-            stats = default_stats.copy()
-    else:
-        stats = default_stats.copy()
-
-def log_to_csv(status):
-    filepath = os.path.join(LOG_FOLDER, CURRENT_LOG_FILE)
-    need_header = not os.path.exists(filepath)
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    try:
-        with open(filepath, 'a') as f:
-            if need_header: 
-                f.write("Timestamp,Status,Study,Phone,Desk,Slouch,Distracted\n")
-            f.write(f"{now},{status},{int(stats['study_time'])},{int(stats['phone_time'])},{int(stats['desk_time'])},{int(stats['slouch_time'])},{int(stats['distracted_time'])}\n")
-    except Exception as e: print(f"⚠️ Log error: {e}")
-
-def archive_old_session():
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    old_log = os.path.join(LOG_FOLDER, CURRENT_LOG_FILE)
-    if os.path.exists(old_log):
-        try: os.rename(old_log, os.path.join(LOG_FOLDER, f"archive_log_{timestamp}.csv"))
-        except OSError: pass
-    if os.path.exists(SAVE_FILE): os.remove(SAVE_FILE)
-
-def get_gaze_ratio(eye_points, landmarks):
-    left_corner = landmarks[eye_points[0]]
-    right_corner = landmarks[eye_points[1]]
-    iris_center = landmarks[eye_points[2]]
-    eye_width = math.hypot(right_corner.x - left_corner.x, right_corner.y - left_corner.y)
-    dist_to_left = math.hypot(iris_center.x - left_corner.x, iris_center.y - left_corner.y)
-    if eye_width == 0: return 0.5
-    return dist_to_left / eye_width
-
-# --- 4. THREADED CAMERA CLASS ---
-class CameraStream:
-    def __init__(self):
-        self.stream = cv2.VideoCapture(0)
-        if not self.stream.isOpened(): self.stream = cv2.VideoCapture(1)
-        
-        # Optimize camera settings
-        self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.stream.set(cv2.CAP_PROP_FPS, 30)
-        
-        (self.grabbed, self.frame) = self.stream.read()
+    def stop(self):
+        worker = self.worker
+        if worker: worker.stop()
+        # Wakes a worker waiting for a frame
+        if self.camera: self.camera.stop()
+        # Let the worker finish its last tick before the writers close, so the rows
+        # and journal deltas it records on the way out still reach disk
+        if worker and worker.thread: worker.thread.join(timeout=WORKER_STOP_TIMEOUT)
+        self.event_log.close()
+        self.session_store.close()
+
+# --- 4. CAMERA ---
+# CameraStream lives in frame_sources.py. CAMERA_SOURCE can be a webcam index,
+# a video file, an image folder or "synthetic" (see open_source()).
+CAMERA_SOURCE = 0
+# How long a worker waits for its camera's first frame before giving up
+CAMERA_START_TIMEOUT = 10.0
+# How long Seat.stop() waits for the worker's last tick before closing the logs
+WORKER_STOP_TIMEOUT = 5.0
+
+# Seat id -> camera source. Seat "0" keeps the original log folder, save file and
+# feed names (the Photon subscribes to those); any other seat logs to
+# logs/seat_<id>/ and publishes to "seat<id>-<feed>", e.g.
+#   SEATS = {"0": 0, "1": 1, "2": "desk2.mp4"}
+SEATS = {"0": CAMERA_SOURCE}
+DEFAULT_SEAT = "0"
+
+# --- 5. METRICS ---
+# Scraped from /metrics. Hot-path metrics are plain counter/histogram updates;
+# everything owned by another component is read lazily through gauge callbacks.
+# Per-seat traffic carries a "seat" label; each Seat owns its rate meters and each
+# worker keeps its own children of the counters.
+metrics = Registry()
+process = psutil.Process()
+
+m_capture_frames = metrics.counter("study_capture_frames_total", "Frames delivered by the camera to the analysis worker", labelnames=("seat",))
+m_dropped_frames = metrics.counter("study_dropped_frames_total", "Captured frames the analysis worker never saw because it was busy", labelnames=("seat",))
+m_frame_errors = metrics.counter("study_frame_errors_total", "Frames whose processing raised; the worker logs it and carries on", labelnames=("seat",))
+m_duplicate_frames = metrics.counter("study_duplicate_frames_total", "Due analysis ticks skipped because the motion gate found the frame unchanged", labelnames=("seat",))
+m_analysis_ticks = metrics.counter("study_analysis_ticks_total", "Analysis ticks that ran at least one model", labelnames=("seat",))
+m_model_latency = metrics.histogram("study_model_latency_seconds", "Inference time per model", labelnames=("model",))
+m_stage_latency = metrics.histogram("study_stage_latency_seconds", "Time per pipeline stage", labelnames=("stage",))
+m_encode_latency = metrics.histogram("study_jpeg_encode_seconds", "JPEG encode time per frame and output variant")
+m_capture_fps = metrics.gauge("study_capture_fps", "Camera frames per second (5 s window)", labelnames=("seat",))
+m_analysis_fps = metrics.gauge("study_analysis_fps", "Analysis ticks per second (5 s window)", labelnames=("seat",))
+metrics.gauge("study_upload_queue_depth", "Feed values waiting to be uploaded", fn=lambda: aio_publisher.queue_depth())
+metrics.gauge("study_upload_sent", "Feed values uploaded since start", fn=lambda: aio_publisher.sent)
+metrics.gauge("study_upload_failures", "Feed values dropped after exhausting retries", fn=lambda: aio_publisher.failed)
+metrics.gauge("study_log_pending_rows", "Event log rows buffered but not yet on disk (all seats)",
+              fn=lambda: sum(seat.event_log.lag()[0] for seat in seats.values()))
+metrics.gauge("study_log_flush_age_seconds", "Seconds since the stalest event log last flushed",
+              fn=lambda: max(seat.event_log.lag()[1] for seat in seats.values()))
+metrics.gauge("study_process_cpu_percent", "Process CPU usage since the last scrape", fn=lambda: process.cpu_percent(None))
+metrics.gauge("study_process_rss_bytes", "Process resident memory", fn=lambda: process.memory_info().rss)
+
+# --- 6. FRAME BROADCAST ---
+# The analysis worker publishes each annotated frame to its seat's FrameBroadcaster
+# (video_stream.py); /video_feed viewers encode from there, once per frame per
+# distinct size/quality, so viewers never trigger inference or duplicate encodes.
+VIDEO_JPEG_QUALITY = 70
+
+# Same idea for the dashboard numbers: the worker pushes a snapshot on every
+# status change and at most STATS_PUSH_RATE times a second otherwise, and each
+# /stats_stream client sends only the fields that changed since its last event.
+STATS_PUSH_RATE = 4.0
+SSE_KEEPALIVE = 15.0
+
+class StatsBroadcaster:
+    def __init__(self, rate=STATS_PUSH_RATE):
+        self.cond = threading.Condition()
+        self.interval = 1.0 / rate
+        self.seq = 0
+        self.snapshot = {}
+        self.last_push = 0.0
+
+    def publish(self, stats, force=False):
+        # force=True for status transitions and session actions; routine updates are rate-limited
+        now = time.monotonic()
+        if not force and now - self.last_push < self.interval: return
+        snapshot = {k: round(v, 1) if isinstance(v, float) else v for k, v in stats.items()}
+        with self.cond:
+            self.snapshot = snapshot
+            self.seq += 1
+            self.last_push = now
+            self.cond.notify_all()
+
+    def wait(self, last_seq, timeout=SSE_KEEPALIVE):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != last_seq, timeout=timeout):
+                return last_seq, None
+            return self.seq, self.snapshot
+
+# --- 7. ANALYSIS WORKER ---
+# One background thread per seat owns its camera, runs the models and accumulates stats.
+class AnalysisWorker:
+    def __init__(self, seat):
+        self.seat = seat
         self.stopped = False
+        self.thread = None
+        # False: annotate frames only while a /video_feed viewer is attached
+        self.always_draw = False
+
+        self.last_sent_status_time = 0
+        self.last_sent_stats_time = 0
+
+        rates = dict(DEFAULT_RELATIVE_RATES, yolo=YOLO_KEYFRAME_RATE) if TRACKER_ENABLED else None
+        self.scheduler = AdaptiveScheduler(target_rate=ANALYSIS_TARGET_RATE, cpu_budget=ANALYSIS_CPU_BUDGET, relative_rates=rates)
+        self.tracker = BoxTracker() if TRACKER_ENABLED else None
+        self.motion_gate = MotionGate(threshold=MOTION_THRESHOLD, refresh_interval=MOTION_REFRESH_INTERVAL)
+        # Built by prepare() once the shared YOLO model has loaded
+        self.model = None
+        self.detectors = None
+        self.model_timings = {}
+        # This seat's children of the labelled counters in section 5
+        (self.m_capture_frames, self.m_dropped_frames, self.m_frame_errors, self.m_duplicate_frames,
+         self.m_analysis_ticks) = (family.labels(seat=seat.seat_id) for family in
+                                   (m_capture_frames, m_dropped_frames, m_frame_errors, m_duplicate_frames, m_analysis_ticks))
+        # Seconds spent in each pipeline stage for the most recent frame
+        self.stage_timings = {}
+        self.last_loop_time = None
+        # Reused colour-conversion target (detectors are done with it before the next tick)
+        self.frame_rgb = None
+
+        self.cached_results_yolo = None
+        self.cached_results_pose = None
+        self.cached_results_face = None
+        self.cached_results_hands = None
+        self.detected_names = []
+
+        self.gaze_score = 0.5
+        self.vertical_dist = 0.2
+        self.is_slouching = False
+        self.is_looking_away = False
+        self.hand_action = "None"
+        self.features = TickFeatures()
+        self.status_filter = None
+        if STATUS_SMOOTHING:
+            self.status_filter = StatusFilter(SLOUCH_THRESHOLD, GAZE_THRESHOLD_LEFT, GAZE_THRESHOLD_RIGHT,
+                                              slouch_margin=SLOUCH_HYSTERESIS, gaze_margin=GAZE_HYSTERESIS,
+                                              min_dwell=STATUS_MIN_DWELL, dwell_overrides={"On Phone": PHONE_MIN_DWELL})
+
+        self.current_status = seat.stats.snapshot()["status"]
+        self.previous_status = self.current_status
 
     def start(self):
-        threading.Thread(target=self.update, args=()).start()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
         return self
 
-    def update(self):
-        while True:
-            if self.stopped:
-                return
-            (self.grabbed, self.frame) = self.stream.read()
-
-    def read(self):
-        return self.frame
-
     def stop(self):
+        # The loop notices within one frame wait; detectors are shut down on the way out
         self.stopped = True
-        self.stream.release()
-
-# Global camera instance
-camera_stream = None
-
-# --- 5. PROCESSING LOOP ---
-def generate_frames():
-    global is_running, stats, camera_stream
-    
-    if camera_stream is None:
-        camera_stream = CameraStream().start()
-        time.sleep(2.0)
-
-    last_sent_status_time = 0
-    last_sent_stats_time = 0
-    last_autosave_time = 0
-    
-    frame_count = 0
-    SKIP_FRAMES = 3 
-    last_loop_time = time.time()
-    
-    cached_results_yolo = None
-    cached_results_pose = None
-    cached_results_face = None
-    cached_results_hands = None
-    
-    gaze_score = 0.5
-    vertical_dist = 0.2
-    is_slouching = False
-    is_looking_away = False
-    hand_action = "None"
-    
-    current_status = stats["status"]
-    previous_status = stats["status"]
 
-    while True:
-        frame = camera_stream.read()
-        if frame is None: break
-        
-        display_frame = cv2.resize(frame, (640, 480))
-        
-        if is_running:
-            current_time = time.time()
-            dt = current_time - last_loop_time
-            last_loop_time = current_time
-            frame_count += 1
-            
-            # --- AI PROCESSING ---
-            if frame_count % (SKIP_FRAMES + 1) == 0:
-                frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                
-                cached_results_pose = pose.process(frame_rgb)
-                cached_results_face = face_mesh.process(frame_rgb)
-                cached_results_hands = hands.process(frame_rgb) 
-                
-                try:
-                    cached_results_yolo = model(display_frame, verbose=False)
-                    detected_names = [model.names[int(cls)] for cls in cached_results_yolo[0].boxes.cls]
-                except:
-                    detected_names = []
-                    cached_results_yolo = None
-                
-                # --- LOGIC ---
-                is_slouching = False
-                if cached_results_pose.pose_landmarks:
-                    lm = cached_results_pose.pose_landmarks.landmark
-                    nose_y = lm[mp_pose.PoseLandmark.NOSE.value].y
-                    shoulder_y = (lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y + lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y) / 2
-                    vertical_dist = shoulder_y - nose_y
-                    if vertical_dist < SLOUCH_THRESHOLD: is_slouching = True
-
-                is_looking_away = False
-                if cached_results_face.multi_face_landmarks:
-                    mesh_points = cached_results_face.multi_face_landmarks[0].landmark
-                    gaze_r = get_gaze_ratio([33, 133, 468], mesh_points)
-                    gaze_l = get_gaze_ratio([362, 263, 473], mesh_points)
-                    gaze_score = (gaze_r + gaze_l) / 2
-                    if gaze_score < GAZE_THRESHOLD_LEFT or gaze_score > GAZE_THRESHOLD_RIGHT: is_looking_away = True
-
-                hands_visible = False
-                hand_action = "None"
-                if cached_results_hands.multi_hand_landmarks:
-                    hands_visible = True
-                    for hand_landmarks in cached_results_hands.multi_hand_landmarks:
-                        lm = hand_landmarks.landmark
-                        thumb_tip = lm[mp_hands.HandLandmark.THUMB_TIP]
-                        index_tip = lm[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                        pinch_dist = math.hypot(thumb_tip.x - index_tip.x, thumb_tip.y - index_tip.y)
-                        
-                        if pinch_dist < 0.04: 
-                            hand_action = "Writing"
-                            break 
-                        
-                        wrist = lm[mp_hands.HandLandmark.WRIST]
-                        index_mcp = lm[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-                        pinky_mcp = lm[mp_hands.HandLandmark.PINKY_MCP]
-                        index_tip = lm[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                        middle_tip = lm[mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-                        
-                        if wrist.y > 0.4:
-                            if index_mcp.y < wrist.y and pinky_mcp.y < wrist.y:
-                                if index_tip.y > index_mcp.y and middle_tip.y > lm[mp_hands.HandLandmark.MIDDLE_FINGER_MCP].y:
-                                    hand_action = "Typing"
-                stats["hands_detected"] = hands_visible
-
-                found_person = "person" in detected_names
-                found_phone = "cell phone" in detected_names
-                found_study_obj = any(x in detected_names for x in ["book", "laptop", "keyboard", "mouse"])
-
-                # --- FINAL STATUS DECISION (Priority Order) ---
-                # Priority 1: Phone (Always Bad) - Overrides everything
-                if found_phone:
-                    current_status = "On Phone"
-                
-                # Priority 2: Distracted (Looking Away or Slouching) - Overrides Studying!
-                # If you are writing but looking at the ceiling, you are distracted.
-                elif is_looking_away or is_slouching:
-                     # Looking away OR Slouching = Distracted
-                    current_status = "Distracted"
-                
-                # Priority 3: Studying (Action or Object)
-                # Only if NOT looking away and NOT slouching
-                elif hand_action in ["Writing", "Typing"] or found_study_obj:
-                    current_status = "Studying"
-                
-                # Priority 4: At Desk but doing nothing (Also Distracted/Idle)
-                elif found_person:
-                    current_status = "Distracted"
-                
-                else:
-                    current_status = "Away"
-                
-                stats["status"] = current_status
-
-            # --- TIME ACCUMULATION ---
-            current_status = stats["status"]
-            if current_status == "On Phone": stats["phone_time"] += dt
-            elif current_status == "Studying": stats["study_time"] += dt
-            elif current_status == "Distracted": 
-                stats["distracted_time"] += dt
-                stats["desk_time"] += dt
-            elif current_status == "Slouching": 
-                stats["slouch_time"] += dt
-                stats["distracted_time"] += dt # Slouching counts as distracted time in consolidation
-            elif current_status == "At Desk": stats["desk_time"] += dt
-            elif current_status == "Away": stats["away_time"] += dt
-
-            # Logging
-            if current_status != previous_status:
-                log_to_csv(current_status)
-                previous_status = current_status
-
-            if current_time - last_autosave_time > 5.0:
-                save_state_to_json()
-                last_autosave_time = current_time
-
-            # Upload
+    def prepare(self):
+        # Waits for YOLO, then builds and warms this seat's MediaPipe graphs
+        self.model, predict_args = yolo.get()
+        name = f"detectors:{self.seat.seat_id}"
+        startup.mark(name, "loading")
+        try:
+            self.detectors = DetectorPool(self.model, mode=DETECTOR_MODE, yolo_kwargs=predict_args,
+                                          batcher=shared_yolo_batcher(self.model, predict_args))
+            self.detectors.warm_up()
+        except Exception as e:
+            startup.mark(name, "failed", str(e))
+            raise
+        startup.mark(name, "ready")
+
+    def run(self):
+        seat = self.seat
+        try: self.loop()
+        finally:
+            if self.detectors: self.detectors.shutdown()
+            # Let the next ensure_worker() (a viewer, a session action) try again
+            with seat.lock:
+                if seat.worker is self: seat.worker = None
+
+    def loop(self):
+        seat = self.seat
+        # The camera opens while the models load instead of after them
+        camera = startup.add(f"camera:{seat.seat_id}", seat.open_camera)
+        try:
+            self.prepare()
+            # open_camera() gives up on its own after CAMERA_START_TIMEOUT; the slack covers opening the device
+            camera_stream = camera.get(timeout=CAMERA_START_TIMEOUT + 5.0)
+        except Exception as e:
+            print(f"❌ [{seat.seat_id}] Analysis worker could not start: {e}")
+            return
+        last_error_print = 0.0
+
+        # Frames are leased from the camera's buffer ring and drawn on in place. The
+        # broadcaster hands the lease back once a newer frame is out and no viewer is
+        # still encoding this one, so the camera never refills a buffer in use.
+        last_seq = 0
+        while not self.stopped:
+            latest = camera_stream.wait_for_frame(last_seq, timeout=1.0, lease=True)
+            if latest is None:
+                if camera_stream.stopped: break
+                continue
+            seq, frame, frame_time = latest
+            self.m_capture_frames.inc(seq - last_seq)
+            if last_seq and seq - last_seq > 1: self.m_dropped_frames.inc(seq - last_seq - 1)
+            seat.capture_rate.mark()
+            last_seq = seq
+
+            # dt is measured between real capture timestamps, not loop iterations
+            try: display_frame = self.process_frame(frame, frame_time)
+            except Exception as e:
+                # One bad frame (a detector hiccup) must not end tracking for the seat
+                self.m_frame_errors.inc()
+                if time.monotonic() - last_error_print > 10.0:
+                    print(f"⚠️ [{seat.seat_id}] Frame processing failed: {e!r}")
+                    last_error_print = time.monotonic()
+                camera_stream.release(seq)
+                continue
+            # Encoded lazily by whoever is watching (see video_stream.py)
+            seat.broadcaster.publish(display_frame, release=lambda seq=seq: camera_stream.release(seq))
+
+    def process_frame(self, frame, current_time):
+        self.stage_timings.clear()
+        start = time.perf_counter()
+        # Cameras are opened at 640x480, so this is usually a no-op worth skipping
+        display_frame = frame if frame.shape[:2] == (480, 640) else cv2.resize(frame, (640, 480))
+        self.stage_timings["resize"] = time.perf_counter() - start
+
+        seat = self.seat
+        # Held for the whole tick so session actions land between ticks (see stats_store.py)
+        with seat.stats.lock:
+            if not seat.is_running:
+                self.last_loop_time = current_time
+                return display_frame
+            self.tick(display_frame, current_time)
+
+        # --- DRAWING ---
+        # Overlays are only worth drawing if someone is watching this seat
+        if self.always_draw or seat.broadcaster.viewers:
+            start = time.perf_counter()
+            display_frame = self.draw(display_frame)
+            self.stage_timings["draw"] = time.perf_counter() - start
+        for stage in ("resize", "track", "logic", "bookkeeping", "draw"):
+            if stage in self.stage_timings: m_stage_latency.labels(stage=stage).observe(self.stage_timings[stage])
+        return display_frame
+
+    def tick(self, display_frame, current_time):
+        seat = self.seat
+        stats = seat.stats
+        dt = current_time - self.last_loop_time if self.last_loop_time is not None else 0.0
+        self.last_loop_time = current_time
+
+        # --- AI PROCESSING ---
+        # Each detector runs at its own adaptive cadence; the rest reuse cached results.
+        # An unchanged scene skips inference entirely until the gate forces a refresh.
+        # Between keyframes the tracker moves the boxes; if it loses confidence YOLO runs now
+        early = False
+        if self.tracker:
+            start = time.perf_counter()
+            self.tracker.propagate(display_frame)
+            self.stage_timings["track"] = time.perf_counter() - start
+        due = self.scheduler.due(current_time, person_present="person" in self.detected_names)
+        if self.tracker and "yolo" not in due and self.tracker.needs_detection(current_time):
+            due, early = ["yolo"] + due, True
+        if due:
+            if self.motion_gate.changed(display_frame, current_time) or early:
+                self.analyze(display_frame, due, current_time)
+                self.m_analysis_ticks.inc()
+                seat.analysis_rate.mark()
+            else:
+                self.m_duplicate_frames.inc()
+
+        start = time.perf_counter()
+
+        # --- TIME ACCUMULATION ---
+        current_status = stats.get("status")
+        self.current_status = current_status
+        if current_status == "On Phone": stats.add("phone_time", dt)
+        elif current_status == "Studying": stats.add("study_time", dt)
+        elif current_status == "Distracted":
+            stats.add("distracted_time", dt)
+            stats.add("desk_time", dt)
+        elif current_status == "Slouching":
+            stats.add("slouch_time", dt)
+            stats.add("distracted_time", dt) # Slouching counts as distracted time in consolidation
+        elif current_status == "At Desk": stats.add("desk_time", dt)
+        elif current_status == "Away": stats.add("away_time", dt)
+
+        # Logging
+        status_changed = current_status != self.previous_status
+        if status_changed:
+            seat.log(current_status, self.distraction_reason() if current_status == "Distracted" else "")
+            self.previous_status = current_status
+
+        # One immutable snapshot per tick for /get_stats, the dashboards and the journal
+        snapshot = stats.commit()
+
+        # Dashboards: transitions go out immediately, time counters at STATS_PUSH_RATE
+        seat.stats_channel.publish(snapshot, force=status_changed)
+
+        # Hand the tick's stats to the session journal (written by its own thread)
+        seat.session_store.record(snapshot)
+
+        # Upload (queued; the publisher coalesces and rate-limits)
+        if (current_time - self.last_sent_status_time > 3.0):
+            aio_publisher.publish(seat.feed(FEED_STATUS), current_status)
+            self.last_sent_status_time = current_time
+
+        if (current_time - self.last_sent_stats_time > 30.0):
+            percent = stats.percentages()
+            if percent:
+                aio_publisher.publish(seat.feed(FEED_PERCENT_STUDY), percent["study_time"])
+                aio_publisher.publish(seat.feed(FEED_PERCENT_PHONE), percent["phone_time"])
+                aio_publisher.publish(seat.feed(FEED_PERCENT_DISTRACTED), percent["distracted_time"])
+            self.last_sent_stats_time = current_time
+
+        self.stage_timings["bookkeeping"] = time.perf_counter() - start
+
+    def analyze(self, display_frame, which, current_time):
+        frame_rgb = self.frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB, dst=self.frame_rgb)
+        results = {}
+
+        # --- CASCADE STAGE 1: YOLO decides whether anyone is in the seat ---
+        if "yolo" in which:
+            results.update(self.detectors.run(display_frame, frame_rgb, ["yolo"]))
+            self.record_timings(["yolo"], current_time)
             try:
-                if (current_time - last_sent_status_time > 3.0):
-                    aio.send(FEED_STATUS, current_status)
-                    last_sent_status_time = current_time
-                
-                if (current_time - last_sent_stats_time > 30.0):
-                    total = stats["study_time"] + stats["phone_time"] + stats["distracted_time"]
-                    if total > 0:
-                        aio.send(FEED_PERCENT_STUDY, int((stats["study_time"]/total)*100))
-                        aio.send(FEED_PERCENT_PHONE, int((stats["phone_time"]/total)*100))
-                        aio.send(FEED_PERCENT_DISTRACTED, int((stats["distracted_time"]/total)*100))
-                    last_sent_stats_time = current_time
-            except: pass
-
-            # --- DRAWING ---
-            if cached_results_yolo:
-                try: display_frame = cached_results_yolo[0].plot(img=display_frame)
+                self.cached_results_yolo = results["yolo"]
+                self.detected_names = [self.model.names[int(cls)] for cls in self.cached_results_yolo[0].boxes.cls]
+            except:
+                self.detected_names = []
+                self.cached_results_yolo = None
+            if self.tracker and self.cached_results_yolo:
+                boxes = self.cached_results_yolo[0].boxes
+                self.tracker.update(display_frame, boxes.xyxy.tolist(), self.detected_names, boxes.conf.tolist(), current_time)
+            # Someone just sat down: pick up any landmark model whose interval has elapsed
+            which = self.scheduler.due(current_time, person_present="person" in self.detected_names)
+        detected_names = self.detected_names
+
+        # Empty seat short-circuits every landmark model
+        if "person" not in detected_names:
+            self.cached_results_pose = self.cached_results_face = self.cached_results_hands = None
+
+        # --- CASCADE STAGE 2: landmark models on crops around the person ---
+        stage2 = [name for name in which if name != "yolo"]
+        if stage2 and "person" in detected_names:
+            # The tracked box follows the person between keyframes; the YOLO one is as of the last keyframe
+            person_box = self.tracker.largest_box("person") if self.tracker else None
+            if person_box is None: person_box = largest_person_box(self.cached_results_yolo, self.model.names)
+            rois = {"face": head_roi(self.cached_results_pose, person_box, frame_rgb.shape),
+                    "hands": hands_roi(self.cached_results_pose, person_box, frame_rgb.shape)}
+            results.update(self.detectors.run(display_frame, frame_rgb, stage2, rois))
+            self.record_timings(stage2, current_time)
+        if "pose" in results: self.cached_results_pose = results["pose"]
+        if "face" in results: self.cached_results_face = results["face"]
+        if "hands" in results: self.cached_results_hands = results["hands"]
+        logic_start = time.perf_counter()
+
+        # --- LOGIC ---
+        # Landmarks -> NumPy features once per tick (see features.py)
+        self.features = extract_features(self.cached_results_pose, self.cached_results_face, self.cached_results_hands)
+        features = self.features
+
+        self.is_slouching = False
+        if features.posture_dist is not None:
+            self.vertical_dist = features.posture_dist
+            if self.vertical_dist < SLOUCH_THRESHOLD: self.is_slouching = True
+
+        self.is_looking_away = False
+        if features.gaze_score is not None:
+            self.gaze_score = features.gaze_score
+            if "face" in results: self.scheduler.record_gaze(self.gaze_score)
+            if self.gaze_score < GAZE_THRESHOLD_LEFT or self.gaze_score > GAZE_THRESHOLD_RIGHT: self.is_looking_away = True
+
+        hand_action = features.hand_action
+        self.hand_action = hand_action
+        hand_study = hand_action in ["Writing", "Typing"]
+        stats = self.seat.stats
+        stats.set("hands_detected", features.hands_count > 0)
+
+        # A tracked object that YOLO missed on one keyframe is still there
+        present = (set(detected_names) | self.tracker.present_names()) if self.tracker else set(detected_names)
+        found_person = "person" in present
+        found_phone = "cell phone" in present
+        found_study_obj = any(x in present for x in ["book", "laptop", "keyboard", "mouse"])
+
+        # Smoothed signals with hysteresis replace the single-tick ones (see status_filter.py)
+        if self.status_filter:
+            f = self.status_filter.smooth(current_time, found_phone, found_person, found_study_obj,
+                                          hand_study, gaze=features.gaze_score, posture=features.posture_dist)
+            found_phone, found_person, found_study_obj = f["phone"], f["person"], f["study_obj"]
+            self.is_looking_away, self.is_slouching = f["looking_away"], f["slouching"]
+            # Smoothed both ways: a missed frame doesn't drop Writing/Typing, a single one doesn't start it
+            hand_study = f["hand_study"]
+
+        # --- FINAL STATUS DECISION (Priority Order) ---
+        # Priority 1: Phone (Always Bad) - Overrides everything
+        if found_phone:
+            current_status = "On Phone"
+
+        # Priority 2: Distracted (Looking Away or Slouching) - Overrides Studying!
+        # If you are writing but looking at the ceiling, you are distracted.
+        elif self.is_looking_away or self.is_slouching:
+             # Looking away OR Slouching = Distracted
+            current_status = "Distracted"
+
+        # Priority 3: Studying (Action or Object)
+        # Only if NOT looking away and NOT slouching
+        elif hand_study or found_study_obj:
+            current_status = "Studying"
+
+        # Priority 4: At Desk but doing nothing (Also Distracted/Idle)
+        elif found_person:
+            current_status = "Distracted"
+
+        else:
+            current_status = "Away"
+
+        # Learned classifier (see classifier.py): same inputs, replaces the rule chain's answer
+        if feature_recorder or status_classifier:
+            row = feature_row(features, class_confidences(self.cached_results_yolo, self.model.names))
+            if feature_recorder: feature_recorder.record(self.seat.seat_id, row, current_status, self.seat.label)
+            if status_classifier: current_status = status_classifier.predict(vectorize(row))
+
+        # Minimum dwell + majority vote before a new status is committed
+        if self.status_filter: current_status = self.status_filter.debounce(current_status, current_time)
+        stats.set("status", current_status)
+        self.stage_timings["logic"] = time.perf_counter() - logic_start
+
+    def record_timings(self, names, current_time):
+        timings = {name: self.detectors.timings[name] for name in names}
+        self.model_timings.update(timings)
+        self.stage_timings.update(timings)
+        for name, seconds in timings.items(): m_model_latency.labels(model=name).observe(seconds)
+        self.scheduler.record(timings, current_time)
+
+    def draw_tracks(self, display_frame):
+        # Propagated boxes with their track IDs; YOLO's own plot() would show keyframe positions
+        for track in self.tracker.tracks:
+            x0, y0, x1, y1 = (int(v) for v in track.box)
+            color = (0, 0, 255) if track.name == "cell phone" else (255, 128, 0)
+            if track.misses: color = (128, 128, 128)
+            cv2.rectangle(display_frame, (x0, y0), (x1, y1), color, 2)
+            cv2.putText(display_frame, f"#{track.id} {track.name}", (x0, max(15, y0 - 5)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    def distraction_reason(self):
+        if self.is_slouching: return "Slouching"
+        if self.is_looking_away: return "Looking Away"
+        return "Idle"
+
+    def draw(self, display_frame):
+        current_status = self.current_status
+        if self.cached_results_yolo:
+            if self.tracker: self.draw_tracks(display_frame)
+            else:
+                try: display_frame = self.cached_results_yolo[0].plot(img=display_frame)
                 except: pass
-                
-                color = (0, 255, 0)
-                if current_status == "On Phone": color = (0, 0, 255)
-                elif current_status == "Distracted": color = (0, 165, 255)
-                
-                cv2.putText(display_frame, f"Status: {current_status}", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-                
-                if current_status == "Distracted":
-                    reason = ""
-                    if is_slouching: reason = "Slouching"
-                    elif is_looking_away: reason = "Looking Away"
-                    else: reason = "Idle"
-                    cv2.putText(display_frame, f"Reason: {reason}", (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
-                
-                if cached_results_hands.multi_hand_landmarks:
-                    for hl in cached_results_hands.multi_hand_landmarks:
-                        mp_drawing.draw_landmarks(display_frame, hl, mp_hands.HAND_CONNECTIONS)
-                    if hand_action != "None":
-                        cv2.putText(display_frame, f"Action: {hand_action}", (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-
-                # Draw Gaze Points (Face) - INDEPENDENT DRAWING
-                if cached_results_face and cached_results_face.multi_face_landmarks:
-                    mesh = cached_results_face.multi_face_landmarks[0].landmark
-                    eye_color = (0, 0, 255) if is_looking_away else (0, 255, 0)
-                    
-                    h, w, _ = display_frame.shape
-                    
-                    # Draw Left Iris (473)
-                    cx_l = int(mesh[473].x * w); cy_l = int(mesh[473].y * h)
-                    cv2.circle(display_frame, (cx_l, cy_l), 4, eye_color, -1)
-                    cv2.circle(display_frame, (cx_l, cy_l), 6, (255, 255, 255), 1) # White border
-                    
-                    # Draw Right Iris (468)
-                    cx_r = int(mesh[468].x * w); cy_r = int(mesh[468].y * h)
-                    cv2.circle(display_frame, (cx_r, cy_r), 4, eye_color, -1)
-                    cv2.circle(display_frame, (cx_r, cy_r), 6, (255, 255, 255), 1) # White border
-                    
-                    # Draw Gaze Text
-                    cv2.putText(display_frame, f"Gaze Score: {gaze_score:.2f}", (w - 250, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, eye_color, 2)
-
-                # Draw Slouch Line (Pose) - INDEPENDENT DRAWING
-                if cached_results_pose and cached_results_pose.pose_landmarks:
-                     lm = cached_results_pose.pose_landmarks.landmark
-                     if (lm[mp_pose.PoseLandmark.NOSE.value].visibility > 0.5):
-                        h, w, _ = display_frame.shape
-                        nose_pt = (int(lm[mp_pose.PoseLandmark.NOSE.value].x * w), int(lm[mp_pose.PoseLandmark.NOSE.value].y * h))
-                        sh_y = int((lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y + lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y) / 2 * h)
-                        l_color = (0, 0, 255) if is_slouching else (0, 255, 0)
-                        cv2.line(display_frame, nose_pt, (nose_pt[0], sh_y), l_color, 4)
-                        cv2.putText(display_frame, f"Posture: {vertical_dist:.2f}", (nose_pt[0] + 10, nose_pt[1]), cv2.FONT_HERSHEY_SIMPLEX, 0.6, l_color, 2)
 
+            color = (0, 255, 0)
+            if current_status == "On Phone": color = (0, 0, 255)
+            elif current_status == "Distracted": color = (0, 165, 255)
+
+            cv2.putText(display_frame, f"Status: {current_status}", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+
+            if current_status == "Distracted":
+                reason = self.distraction_reason()
+                cv2.putText(display_frame, f"Reason: {reason}", (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+
+            if self.cached_results_hands and self.cached_results_hands.multi_hand_landmarks:
+                for hl in self.cached_results_hands.multi_hand_landmarks:
+                    mp_drawing.draw_landmarks(display_frame, hl, mp_hands.HAND_CONNECTIONS)
+                if self.hand_action != "None":
+                    cv2.putText(display_frame, f"Action: {self.hand_action}", (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+            # Draw Gaze Points (Face) - INDEPENDENT DRAWING
+            if self.cached_results_face and self.cached_results_face.multi_face_landmarks:
+                mesh = self.cached_results_face.multi_face_landmarks[0].landmark
+                eye_color = (0, 0, 255) if self.is_looking_away else (0, 255, 0)
+
+                h, w, _ = display_frame.shape
+
+                # Draw Left Iris (473)
+                cx_l = int(mesh[473].x * w); cy_l = int(mesh[473].y * h)
+                cv2.circle(display_frame, (cx_l, cy_l), 4, eye_color, -1)
+                cv2.circle(display_frame, (cx_l, cy_l), 6, (255, 255, 255), 1) # White border
+
+                # Draw Right Iris (468)
+                cx_r = int(mesh[468].x * w); cy_r = int(mesh[468].y * h)
+                cv2.circle(display_frame, (cx_r, cy_r), 4, eye_color, -1)
+                cv2.circle(display_frame, (cx_r, cy_r), 6, (255, 255, 255), 1) # White border
+
+                # Draw Gaze Text
+                cv2.putText(display_frame, f"Gaze Score: {self.gaze_score:.2f}", (w - 250, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, eye_color, 2)
+
+            # Draw Slouch Line (Pose) - INDEPENDENT DRAWING
+            if self.cached_results_pose and self.cached_results_pose.pose_landmarks:
+                 lm = self.cached_results_pose.pose_landmarks.landmark
+                 if (lm[mp_pose.PoseLandmark.NOSE.value].visibility > 0.5):
+                    h, w, _ = display_frame.shape
+                    nose_pt = (int(lm[mp_pose.PoseLandmark.NOSE.value].x * w), int(lm[mp_pose.PoseLandmark.NOSE.value].y * h))
+                    sh_y = int((lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y + lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y) / 2 * h)
+                    l_color = (0, 0, 255) if self.is_slouching else (0, 255, 0)
+                    cv2.line(display_frame, nose_pt, (nose_pt[0], sh_y), l_color, 4)
+                    cv2.putText(display_frame, f"Posture: {self.vertical_dist:.2f}", (nose_pt[0] + 10, nose_pt[1]), cv2.FONT_HERSHEY_SIMPLEX, 0.6, l_color, 2)
+        return display_frame
+
+# The shared YOLO model is only thread-safe behind the batcher, so use it whenever
+# more than one seat is configured
+yolo_batcher = None
+batcher_lock = threading.Lock()
+
+def shared_yolo_batcher(model, predict_args):
+    global yolo_batcher
+    if len(SEATS) < 2: return None
+    with batcher_lock:
+        if yolo_batcher is None: yolo_batcher = YoloBatcher(model, predict_args).start()
+    return yolo_batcher
+
+seats = {}
+default_seat = None
+
+def start(open_seats=True):
+    # Starts the background services and opens the configured seats. Called from
+    # __main__ and create_app(); benchmark.py passes open_seats=False.
+    global adafruit, aio_publisher, yolo, status_classifier, feature_recorder, default_seat
+    if not os.path.exists(LOG_FOLDER): os.makedirs(LOG_FOLDER)
+    adafruit = startup.add("adafruit", lambda: make_transport(AIO_TRANSPORT, AIO_USERNAME, AIO_KEY, AIO_HOST, AIO_PORT))
+    aio_publisher = AioPublisher(adafruit.get).start()
+    yolo = startup.add("yolo", load_model)
+
+    if STATUS_CLASSIFIER != "rules":
         try:
-            ret, buffer = cv2.imencode('.jpg', display_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        except: pass
+            status_classifier = StatusClassifier.load(STATUS_CLASSIFIER)
+            print(f"✅ Status classifier loaded: {STATUS_CLASSIFIER}")
+        except Exception as e:
+            print(f"⚠️ Could not load status classifier ({e}); using the rule chain.")
+    feature_recorder = FeatureRecorder(FEATURE_LOG_FOLDER) if FEATURE_LOG else None
+    if feature_recorder: atexit.register(feature_recorder.close)
+
+    if not open_seats: return
+    for seat_id, source in SEATS.items():
+        if seat_id == DEFAULT_SEAT: seats[seat_id] = Seat(seat_id, source)
+        else: seats[seat_id] = Seat(seat_id, source, os.path.join(LOG_FOLDER, f"seat_{seat_id}"),
+                                    f"seat_{seat_id}_session_save.json", feed_prefix=f"seat{seat_id}-")
+        atexit.register(seats[seat_id].stop)
+    default_seat = seats[DEFAULT_SEAT]
+
+def create_app():
+    # WSGI entry point, e.g. gunicorn --threads 8 "app:create_app()"
+    start()
+    return app
+
+def get_seat(seat_id):
+    seat = seats.get(seat_id)
+    if seat is None: abort(404)
+    return seat
+
+# --- 8. MJPEG VIEWER ---
+FRAME_HEADER = b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n'
+FRAME_TRAILER = b'\r\n'
+
+def generate_frames(seat, max_fps=None, width=None, quality=None):
+    # Header, JPEG and trailer go out as separate chunks so the (cached, shared)
+    # JPEG is written as-is instead of being copied into a new part per viewer
+    for jpeg in seat.broadcaster.viewer(max_fps, width, quality):
+        yield FRAME_HEADER
+        yield jpeg
+        yield FRAME_TRAILER
+
+# --- 9. STATS STREAM ---
+def generate_stats_events(seat):
+    # Server-Sent Events: a full snapshot first, then only the changed fields.
+    # Status changes get their own event type so the badge can react to them alone.
+    last_seq = seat.stats_channel.seq
+    sent = dict(seat.stats_channel.snapshot or seat.stats.snapshot())
+    yield f"event: stats\ndata: {json.dumps(sent)}\n\n"
+    while True:
+        last_seq, snapshot = seat.stats_channel.wait(last_seq)
+        if snapshot is None:
+            yield ": keepalive\n\n"
+            continue
+        delta = {k: v for k, v in snapshot.items() if sent.get(k) != v}
+        if not delta: continue
+        if "status" in delta: yield f"event: status\ndata: {json.dumps(delta['status'])}\n\n"
+        yield f"event: stats\ndata: {json.dumps(delta)}\n\n"
+        sent.update(delta)
 
 # --- WEB ROUTES ---
 @app.route('/')
 def index(): return render_template('index.html')
 
+# The original routes act on the default seat; /seat/<id>/... addresses any seat
 @app.route('/video_feed')
-def video_feed(): return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+@app.route('/seat/<seat_id>/video_feed')
+def video_feed(seat_id=DEFAULT_SEAT):
+    # Optional ?fps=5&width=320&quality=50, e.g. for a grid of thumbnails
+    seat = get_seat(seat_id)
+    max_fps = request.args.get('fps', type=float)
+    width = request.args.get('width', type=int)
+    quality = request.args.get('quality', type=int)
+    if quality: quality = max(10, min(95, quality))
+    if seat.ensure_worker() is None:
+        return jsonify({"error": "analysis unavailable", "components": startup.status()}), 503
+    return Response(generate_frames(seat, max_fps, width, quality), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/continue_session', methods=['POST'])
-def continue_session():
-    global is_running
-    load_previous_state()
-    is_running = True
-    log_to_csv("SESSION RESUMED")
+@app.route('/seat/<seat_id>/continue_session', methods=['POST'])
+def continue_session(seat_id=DEFAULT_SEAT):
+    get_seat(seat_id).continue_session()
     return jsonify({"message": "Resumed"})
 
 @app.route('/new_session', methods=['POST'])
-def new_session():
-    global is_running, stats
-    archive_old_session()
-    stats = default_stats.copy()
-    is_running = True
-    save_state_to_json()
-    log_to_csv("NEW SESSION STARTED")
+@app.route('/seat/<seat_id>/new_session', methods=['POST'])
+def new_session(seat_id=DEFAULT_SEAT):
+    get_seat(seat_id).new_session()
     return jsonify({"message": "New Session"})
 
 @app.route('/stop_session', methods=['POST'])
-def stop_session():
-    global is_running
-    is_running = False
-    save_state_to_json()
-    log_to_csv("SESSION PAUSED")
+@app.route('/seat/<seat_id>/stop_session', methods=['POST'])
+def stop_session(seat_id=DEFAULT_SEAT):
+    get_seat(seat_id).stop_session()
     return jsonify({"message": "Stopped"})
 
 @app.route('/get_stats')
-def get_stats(): return jsonify(stats)
+@app.route('/seat/<seat_id>/stats')
+def get_stats(seat_id=DEFAULT_SEAT):
+    version, snapshot = get_seat(seat_id).stats.versioned()
+    response = jsonify(dict(snapshot))
+    response.headers["X-Stats-Version"] = str(version)
+    return response
+
+@app.route('/stats_stream')
+@app.route('/seat/<seat_id>/stats_stream')
+def stats_stream(seat_id=DEFAULT_SEAT):
+    seat = get_seat(seat_id)
+    return Response(generate_stats_events(seat), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/history')
+@app.route('/seat/<seat_id>/history')
+def history(seat_id=DEFAULT_SEAT):
+    # Archived sessions only. ?since=2025-01-01&until=2025-02-01&every=1d|1w|1mo
+    seat = get_seat(seat_id)
+    try:
+        return jsonify(seat.history.summary(request.args.get('since'), request.args.get('until'),
+                                            request.args.get('every', '1d')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/label', methods=['POST'])
+@app.route('/seat/<seat_id>/label', methods=['POST'])
+def set_label(seat_id=DEFAULT_SEAT):
+    # {"label": "On Phone"} tags recorded feature rows until {"label": null}
+    seat = get_seat(seat_id)
+    seat.label = (request.get_json(silent=True) or {}).get('label')
+    return jsonify({"label": seat.label, "recording": feature_recorder is not None})
+
+@app.route('/seats')
+def list_seats():
+    return jsonify({seat_id: {"status": seat.stats.snapshot()["status"], "running": seat.is_running,
+                              "worker": seat.worker is not None} for seat_id, seat in seats.items()})
+
+@app.route('/get_timings')
+@app.route('/seat/<seat_id>/timings')
+def get_timings(seat_id=DEFAULT_SEAT):
+    # Last analysis tick's per-model latency in milliseconds
+    analysis_worker = get_seat(seat_id).worker
+    if analysis_worker is None: return jsonify({})
+    timings = {name: round(sec * 1000, 1) for name, sec in analysis_worker.model_timings.items()}
+    return jsonify({"latency_ms": timings, "rates_hz": analysis_worker.scheduler.effective_rates(),
+                    "motion_gate": analysis_worker.motion_gate.counters(),
+                    "tracker": analysis_worker.tracker.counters() if analysis_worker.tracker else None})
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the web server is up. Component detail is in /readyz.
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    # Ready once the shared model and the upload client are loaded, and no seat's
+    # camera or detectors (started with its worker) are loading or have failed
+    components = startup.status()
+    ready = startup.ready(("yolo", "adafruit") + tuple(f"{kind}:{seat_id}" for seat_id in seats for kind in ("camera", "detectors")))
+    return jsonify({"ready": ready, "components": components}), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profile')
+def debug_profile():
+    # Samples the analysis worker's stack for ?seconds=N (default 10, max 120) and
+    # returns collapsed stacks for flamegraph.pl / speedscope. No restart needed.
+    # ?seat=<id> picks the seat (default seat otherwise).
+    analysis_worker = get_seat(request.args.get('seat', DEFAULT_SEAT)).worker
+    if analysis_worker is None or analysis_worker.thread is None:
+        return jsonify({"error": "analysis worker not running"}), 409
+    seconds = min(120.0, float(request.args.get('seconds', 10)))
+    interval = max(0.001, float(request.args.get('interval_ms', 5)) / 1000)
+    profiler = SamplingProfiler(analysis_worker.thread.ident, interval).run(seconds)
+    return Response(profiler.collapsed(), mimetype='text/plain')
+
+# --- HEADLESS MODE ---
+# python app.py --headless [--session new]: tracks every seat and uploads to
+# Adafruit IO with no web server, no overlays and no JPEG encoding.
+def run_headless(session="resume"):
+    for seat in seats.values():
+        if session == "new": seat.new_session()
+        else: seat.continue_session()
+    print(f"✅ Headless: tracking {len(seats)} seat(s). Press Ctrl+C to stop.")
+    try:
+        while True: time.sleep(1.0)
+    except KeyboardInterrupt: pass
+    finally:
+        for seat in seats.values(): seat.stop_session()
 
 if __name__ == '__main__':
-    try: app.run(host='0.0.0.0', port=5001, debug=False, threaded=True)
+    parser = argparse.ArgumentParser(description="Study Sergeant")
+    parser.add_argument("--headless", action="store_true", help="track and upload without the web dashboard")
+    parser.add_argument("--session", choices=("resume", "new"), default="resume",
+                        help="headless only: resume the saved session or start a new one")
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    start()
+    try:
+        if args.headless: run_headless(args.session)
+        else: app.run(host='0.0.0.0', port=args.port, debug=False, threaded=True)
     finally: 
-        if camera_stream: camera_stream.stop()
\ No newline at end of file
+        for seat in seats.values(): seat.stop()
+        if yolo_batcher: yolo_batcher.stop()
+        aio_publisher.stop()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import psutil
+
+# --- OFFLINE REPLAY BENCHMARK ---
+# Replays a recording through the full analysis pipeline as fast as it will go
+# and reports throughput, per-stage latency percentiles, CPU and peak memory.
+# No camera, browser or network needed:
+#
+#   python benchmark.py clip.mp4
+#   python benchmark.py frames/ --frames 300 --mode serial
+#   python benchmark.py synthetic --frames 500 --json bench.json
+#
+# Uploads go to a NullTransport and logs/session files to a temp folder, so a
+# run never touches Adafruit IO or the real session.
+
+import app
+from frame_sources import open_source
+from uploader import AioPublisher, NullTransport
+
+STAGES = ("capture", "resize", "track", "yolo", "pose", "face", "hands", "logic", "bookkeeping", "draw", "encode")
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def run_benchmark(source, max_frames=None, warmup=10, clock="video", mode=None, headless=False):
+    scratch = tempfile.mkdtemp(prefix="bench_")
+    app.start(open_seats=False)
+    app.aio_publisher.stop()
+    app.aio_publisher = AioPublisher(NullTransport(), rate_per_minute=1e9).start()
+    if mode: app.DETECTOR_MODE = mode
+    # A throwaway seat: its event log and session file live in the temp folder
+    seat = app.Seat("bench", None, scratch, os.path.join(scratch, "session.json"))
+    seat.is_running = True
+
+    worker = app.AnalysisWorker(seat)
+    worker.prepare()
+    worker.always_draw = not headless
+    capture = open_source(source)
+    if not capture.isOpened():
+        raise SystemExit(f"❌ Could not open source: {source}")
+
+    proc = psutil.Process()
+    samples = {stage: [] for stage in STAGES}
+    frame_times = []
+    peak_rss = proc.memory_info().rss
+    frames = 0
+    measured = 0
+    wall_start = cpu_start = None
+
+    while max_frames is None or measured < max_frames:
+        start = time.perf_counter()
+        ok, frame = capture.read()
+        capture_time = time.perf_counter() - start
+        if not ok: break
+
+        # "video" clock: the scheduler and motion gate see the recording's own timeline
+        ts = frames / capture.fps if clock == "video" else time.time()
+        display_frame = worker.process_frame(frame, ts)
+        if not headless:
+            # One viewer's worth of encoding, as if a browser were watching
+            encode_start = time.perf_counter()
+            seat.broadcaster.publish(display_frame)
+            seat.broadcaster.jpeg(seat.broadcaster.seq, display_frame)
+            worker.stage_timings["encode"] = time.perf_counter() - encode_start
+        frames += 1
+
+        if frames == warmup:
+            wall_start, cpu_start = time.perf_counter(), proc.cpu_times()
+        if frames <= warmup: continue
+
+        measured += 1
+        frame_times.append(time.perf_counter() - start)
+        samples["capture"].append(capture_time)
+        for stage, seconds in worker.stage_timings.items():
+            samples.setdefault(stage, []).append(seconds)
+        if measured % 30 == 0: peak_rss = max(peak_rss, proc.memory_info().rss)
+
+    capture.release()
+    # The worker never ran its own thread, so its detectors are shut down here
+    worker.detectors.shutdown()
+    seat.stop()
+    app.aio_publisher.stop()
+
+    if not measured:
+        raise SystemExit(f"❌ Only {frames} frames read; need more than the {warmup} warm-up frames.")
+
+    wall = time.perf_counter() - wall_start
+    cpu_end = proc.cpu_times()
+    cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    peak_rss = max(peak_rss, proc.memory_info().rss)
+
+    report = {
+        "source": str(source),
+        "detector_mode": app.DETECTOR_MODE,
+        "headless": headless,
+        "frames": measured,
+        "fps": measured / wall,
+        "cpu_percent": 100.0 * cpu / wall,
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        "motion_gate": worker.motion_gate.counters(),
+        "tracker": worker.tracker.counters() if worker.tracker else None,
+        "frame_ms": {p: percentile(frame_times, p) * 1000 for p in (50, 95, 99)},
+        "stages_ms": {},
+    }
+    for stage, values in samples.items():
+        if not values: continue
+        report["stages_ms"][stage] = {"count": len(values),
+                                      **{f"p{p}": percentile(values, p) * 1000 for p in (50, 95, 99)}}
+    return report
+
+def print_report(report):
+    print(f"\n📊 {report['frames']} frames from {report['source']} ({report['detector_mode']} detectors)")
+    print(f"   {report['fps']:.1f} FPS | CPU {report['cpu_percent']:.0f}% | peak RSS {report['peak_rss_mb']:.0f} MB")
+    print("   frame p50/p95/p99: " + " / ".join(f"{v:.1f}" for v in report["frame_ms"].values()) + " ms")
+    print(f"   motion gate: {report['motion_gate']}")
+    if report["tracker"]: print(f"   tracker: {report['tracker']}")
+    print(f"\n   {'stage':<12}{'runs':>7}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for stage, row in report["stages_ms"].items():
+        print(f"   {stage:<12}{row['count']:>7}{row['p50']:>9.2f}{row['p95']:>9.2f}{row['p99']:>9.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recording through the Study Sergeant pipeline.")
+    parser.add_argument("source", help="video file, image folder, camera index or 'synthetic[:WxH]'")
+    parser.add_argument("--frames", type=int, default=None, help="stop after this many measured frames")
+    parser.add_argument("--warmup", type=int, default=10, help="frames to run before measuring")
+    parser.add_argument("--clock", choices=("video", "wall"), default="video",
+                        help="timeline fed to the scheduler: the recording's fps or wall time")
+    parser.add_argument("--mode", choices=("thread", "process", "serial"), default=None)
+    parser.add_argument("--headless", action="store_true", help="skip overlays and JPEG encoding, like app.py --headless")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.source.startswith("synthetic") and args.frames is None:
+        args.frames = 300
+    report = run_benchmark(args.source, args.frames, args.warmup, args.clock, args.mode, args.headless)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f: json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
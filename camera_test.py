@@ -4,9 +4,10 @@ import sys
 def test_camera(index):
     print(f"\n--- Testing camera at index {index} ---")
     
-    # Try to open the camera using the native AVFoundation backend
-    # This is the most important change
-    cap = cv2.VideoCapture(index, cv2.CAP_AVFOUNDATION)
+    # Try to open the camera using the native AVFoundation backend on macOS
+    # This is the most important change (other platforms pick their own backend)
+    backend = cv2.CAP_AVFOUNDATION if sys.platform == "darwin" else cv2.CAP_ANY
+    cap = cv2.VideoCapture(index, backend)
     
     if not cap.isOpened():
         print(f"❌ Error: Could not open camera at index {index}.")
@@ -0,0 +1,206 @@
+import argparse
+import datetime
+import glob
+import os
+import sys
+import threading
+
+import numpy as np
+
+from features import TickFeatures
+
+# --- LEARNED STATUS CLASSIFIER ---
+# An optional replacement for the hand-written priority chain in app.py:
+#
+# 1. Record: with FEATURE_LOG on, every analysis tick appends one row of features
+#    (gaze, posture, hand measurements, best YOLO confidence per class) plus the
+#    rule chain's answer and any live label to Parquet parts under logs/features/.
+# 2. Train:  python classifier.py train logs/features -o models/status_classifier.npz
+#    fits a multinomial logistic regression in NumPy (standardized inputs, L2).
+# 3. Run:    STATUS_CLASSIFIER = "models/status_classifier.npz" in app.py. The
+#    standardization is folded into the weights at load time, so a prediction is
+#    one small matrix-vector product - a few microseconds per tick.
+#
+# Rows carry a "label" when someone set one via POST /label while recording;
+# otherwise training can fall back to the rule chain's output (--from-rules),
+# which is only useful to bootstrap before real labels exist.
+
+YOLO_CONFIDENCE_CLASSES = ("person", "cell phone", "book", "laptop", "keyboard", "mouse")
+FEATURE_NAMES = (("gaze_score", "gaze_missing", "posture_dist", "posture_missing", "pinch_dist",
+                  "hands_count", "writing", "typing")
+                 + tuple("conf_" + name.replace(" ", "_") for name in YOLO_CONFIDENCE_CLASSES))
+
+# Stand-ins for a landmark the models didn't see this tick (the *_missing flags say so)
+GAZE_DEFAULT = 0.5
+POSTURE_DEFAULT = 0.2
+PINCH_DEFAULT = 1.0
+
+def class_confidences(yolo_results, names):
+    # Highest confidence per class of interest in one YOLO result, 0 when absent
+    conf = dict.fromkeys(YOLO_CONFIDENCE_CLASSES, 0.0)
+    try:
+        boxes = yolo_results[0].boxes
+        for cls, c in zip(boxes.cls.tolist(), boxes.conf.tolist()):
+            name = names[int(cls)]
+            if name in conf and c > conf[name]: conf[name] = c
+    except Exception:
+        pass
+    return conf
+
+def feature_row(features: TickFeatures, confidences):
+    return {
+        "gaze_score": GAZE_DEFAULT if features.gaze_score is None else features.gaze_score,
+        "gaze_missing": float(features.gaze_score is None),
+        "posture_dist": POSTURE_DEFAULT if features.posture_dist is None else features.posture_dist,
+        "posture_missing": float(features.posture_dist is None),
+        "pinch_dist": PINCH_DEFAULT if features.pinch_dist is None else features.pinch_dist,
+        "hands_count": float(features.hands_count),
+        "writing": float(features.writing),
+        "typing": float(features.typing),
+        **{"conf_" + name.replace(" ", "_"): confidences[name] for name in YOLO_CONFIDENCE_CLASSES},
+    }
+
+def vectorize(row):
+    return np.array([row[name] for name in FEATURE_NAMES], dtype=np.float32)
+
+# --- RECORDING ---
+class FeatureRecorder:
+    # Buffers rows and writes them as Parquet parts on a background thread
+    def __init__(self, folder, flush_rows=2048):
+        self.folder = folder
+        self.flush_rows = flush_rows
+        self.rows = []
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.parts = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def record(self, seat_id, row, rule_status, label=None):
+        full = {"ts": datetime.datetime.now(), "seat": seat_id, **row, "rule_status": rule_status, "label": label}
+        with self.lock:
+            self.rows.append(full)
+            if len(self.rows) < self.flush_rows: return
+            rows, self.rows = self.rows, []
+        threading.Thread(target=self.write, args=(rows,), daemon=True).start()
+
+    def write(self, rows):
+        import polars as pl
+        with self.io_lock:
+            name = datetime.datetime.now().strftime("features_%Y-%m-%d_%H-%M-%S") + f"_{self.parts}.parquet"
+            self.parts += 1
+            try: pl.DataFrame(rows, infer_schema_length=None).write_parquet(os.path.join(self.folder, name))
+            except Exception as e: print(f"⚠️ Feature log error: {e}")
+
+    def close(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+        if rows: self.write(rows)
+
+# --- RUNTIME ---
+class StatusClassifier:
+    def __init__(self, weights, bias, mean, std, classes):
+        # Fold (x - mean) / std into the weights: logits = x @ W + b
+        self.weights = (weights / std[:, None]).astype(np.float32)
+        self.bias = (bias - (mean / std) @ weights).astype(np.float32)
+        self.classes = list(classes)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        if tuple(data["feature_names"]) != FEATURE_NAMES:
+            raise ValueError(f"{path} was trained on different features; retrain it")
+        return cls(data["weights"], data["bias"], data["mean"], data["std"], data["classes"])
+
+    def predict(self, x):
+        return self.classes[int(np.argmax(x @ self.weights + self.bias))]
+
+    def predict_proba(self, x):
+        z = x @ self.weights + self.bias
+        e = np.exp(z - z.max())
+        return dict(zip(self.classes, (e / e.sum()).tolist()))
+
+# --- TRAINING ---
+def load_dataset(folder, from_rules=False):
+    import polars as pl
+    paths = sorted(glob.glob(os.path.join(folder, "*.parquet")))
+    if not paths: raise SystemExit(f"❌ No feature logs in {folder}")
+    df = pl.concat([pl.read_parquet(p) for p in paths], how="diagonal_relaxed")
+    target = pl.col("label")
+    if from_rules: target = target.fill_null(pl.col("rule_status"))
+    df = df.with_columns(target.alias("target")).drop_nulls("target")
+    if df.is_empty(): raise SystemExit("❌ No labelled rows (record with POST /label, or pass --from-rules)")
+    x = df.select(FEATURE_NAMES).to_numpy().astype(np.float32)
+    return x, df["target"].to_list()
+
+def softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+def train(x, labels, epochs=500, lr=0.5, l2=1e-3, seed=0):
+    # Full-batch gradient descent on the multinomial cross-entropy
+    classes = sorted(set(labels))
+    index = {c: i for i, c in enumerate(classes)}
+    y = np.zeros((len(labels), len(classes)), dtype=np.float32)
+    y[np.arange(len(labels)), [index[c] for c in labels]] = 1.0
+
+    mean, std = x.mean(axis=0), x.std(axis=0)
+    std[std < 1e-6] = 1.0
+    xs = (x - mean) / std
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(0, 0.01, (x.shape[1], len(classes))).astype(np.float32)
+    bias = np.zeros(len(classes), dtype=np.float32)
+    for _ in range(epochs):
+        grad = (softmax(xs @ weights + bias) - y) / len(xs)
+        weights -= lr * (xs.T @ grad + l2 * weights)
+        bias -= lr * grad.sum(axis=0)
+    return {"weights": weights, "bias": bias, "mean": mean, "std": std, "classes": np.array(classes)}
+
+def evaluate(model, x, labels):
+    predictions = [model.predict(row) for row in x]
+    accuracy = float(np.mean([p == t for p, t in zip(predictions, labels)]))
+    confusion = {}
+    for p, t in zip(predictions, labels):
+        confusion.setdefault(t, {}).setdefault(p, 0)
+        confusion[t][p] += 1
+    return accuracy, confusion
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the learned status classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    t = sub.add_parser("train", help="fit a model on recorded feature logs")
+    t.add_argument("folder", help="folder of feature Parquet parts (FEATURE_LOG_FOLDER)")
+    t.add_argument("-o", "--output", default=os.path.join("models", "status_classifier.npz"))
+    t.add_argument("--epochs", type=int, default=500)
+    t.add_argument("--lr", type=float, default=0.5)
+    t.add_argument("--l2", type=float, default=1e-3)
+    t.add_argument("--holdout", type=float, default=0.2, help="fraction of rows kept back for the accuracy check")
+    t.add_argument("--from-rules", action="store_true", help="use the rule chain's status where no label was set")
+    e = sub.add_parser("eval", help="score a trained model on recorded feature logs")
+    e.add_argument("folder")
+    e.add_argument("model")
+    e.add_argument("--from-rules", action="store_true")
+    args = parser.parse_args(argv)
+
+    x, labels = load_dataset(args.folder, args.from_rules)
+    if args.command == "eval":
+        accuracy, confusion = evaluate(StatusClassifier.load(args.model), x, labels)
+        print(f"📊 {len(labels)} rows, accuracy {accuracy:.3f}")
+        for truth, row in sorted(confusion.items()): print(f"   {truth:<12} {row}")
+        return
+
+    # Hold out the most recent rows: neighbouring ticks are near-duplicates, so a random split would flatter the model
+    split = int(len(labels) * (1 - args.holdout))
+    params = train(x[:split], labels[:split], args.epochs, args.lr, args.l2)
+    model = StatusClassifier(params["weights"], params["bias"], params["mean"], params["std"], params["classes"])
+    if split < len(labels):
+        accuracy, _ = evaluate(model, x[split:], labels[split:])
+        print(f"📊 Held-out accuracy: {accuracy:.3f} on {len(labels) - split} rows")
+    # Final model on everything
+    params = train(x, labels, args.epochs, args.lr, args.l2)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    np.savez(args.output, feature_names=np.array(FEATURE_NAMES), **params)
+    print(f"✅ Saved {args.output} ({len(params['classes'])} classes, {len(labels)} rows)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import mediapipe as mp
+
+# --- MEDIAPIPE SETUP ---
+mp_drawing = mp.solutions.drawing_utils
+mp_pose = mp.solutions.pose
+mp_face_mesh = mp.solutions.face_mesh
+mp_hands = mp.solutions.hands
+
+DETECTORS = ("yolo", "pose", "face", "hands")
+
+# Extra margin around a region of interest, as a fraction of its size
+ROI_PADDING = 0.25
+MIN_ROI_SIZE = 48
+
+# The only COCO classes the status logic reads
+YOLO_CLASSES = ("person", "cell phone", "book", "laptop", "keyboard", "mouse")
+EXPORT_DIR = "models"
+
+# --- MODEL LOADING ---
+def _load_pt(path):
+    # Imported here so process-pool workers (which only run MediaPipe) don't pay for torch
+    from ultralytics import YOLO
+    try:
+        return YOLO(path, task="detect")
+    except Exception as e:
+        print(f"⚠️ Model load error: {e}. Attempting re-download.")
+        if os.path.exists(path): os.remove(path)
+        return YOLO(path, task="detect")
+
+def exported_path(path, backend, imgsz, int8):
+    # e.g. models/yolo11n_320.onnx or models/yolo11n_320_int8_openvino_model/
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tag = f"{stem}_{imgsz}" + ("_int8" if int8 else "")
+    if backend == "onnx": return os.path.join(EXPORT_DIR, f"{tag}.onnx")
+    return os.path.join(EXPORT_DIR, f"{tag}_openvino_model")
+
+def load_yolo(path="yolo11n.pt", backend="pytorch", imgsz=640, int8=False):
+    # backend: "pytorch" (the .pt as-is), "onnx" (ONNX Runtime) or "openvino".
+    # Exports are cached under EXPORT_DIR keyed by input size, so only the first
+    # run pays for the export and later runs skip loading torch weights entirely.
+    from ultralytics import YOLO
+    if backend == "pytorch": return _load_pt(path)
+
+    if backend == "onnx" and int8:
+        print("⚠️ INT8 is only supported for the OpenVINO export; exporting ONNX as FP32.")
+        int8 = False
+    cached = exported_path(path, backend, imgsz, int8)
+    try:
+        if not os.path.exists(cached):
+            print(f"⚙️ Exporting {path} to {backend} (imgsz={imgsz}, int8={int8})...")
+            out = _load_pt(path).export(format=backend, imgsz=imgsz, int8=int8)
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            shutil.move(str(out), cached)
+        model = YOLO(cached, task="detect")
+        # ultralytics only builds the runtime backend on the first predict(), so a
+        # missing or broken ONNX Runtime / OpenVINO install shows up here or not at all
+        warm_up_yolo(model, imgsz=imgsz)
+        return model
+    except Exception as e:
+        print(f"⚠️ {backend} backend unavailable ({e}). Falling back to PyTorch.")
+        return _load_pt(path)
+
+def yolo_class_ids(model, class_names=YOLO_CLASSES):
+    return [i for i, name in model.names.items() if name in class_names]
+
+def warm_up_yolo(model, imgsz=640, **yolo_kwargs):
+    # The first predict() sets up the predictor, allocates buffers and (for the
+    # exported backends) compiles kernels; pay for that before the first real frame
+    model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False, imgsz=imgsz, **yolo_kwargs)
+
+def build_pose():
+    return mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+def build_face_mesh():
+    return mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
+
+def build_hands():
+    return mp_hands.Hands(max_num_hands=2, min_detection_confidence=0.5)
+
+SOLUTION_BUILDERS = {"pose": build_pose, "face": build_face_mesh, "hands": build_hands}
+
+# --- REGIONS OF INTEREST ---
+# FaceMesh and Hands run on padded crops around the head and hands instead of the
+# whole frame; landmarks are mapped back to full-frame coordinates afterwards so
+# the rest of the code never sees crop space.
+def expand_box(box, pad, shape):
+    h, w = shape[:2]
+    x0, y0, x1, y1 = box
+    pw, ph = (x1 - x0) * pad, (y1 - y0) * pad
+    x0, y0 = max(0, int(x0 - pw)), max(0, int(y0 - ph))
+    x1, y1 = min(w, int(x1 + pw)), min(h, int(y1 + ph))
+    if x1 - x0 < MIN_ROI_SIZE or y1 - y0 < MIN_ROI_SIZE: return None
+    return (x0, y0, x1, y1)
+
+def largest_person_box(yolo_results, names):
+    # Pixel xyxy of the biggest "person" detection, or None
+    try:
+        boxes = yolo_results[0].boxes
+        best, best_area = None, 0
+        for cls, xyxy in zip(boxes.cls.tolist(), boxes.xyxy.tolist()):
+            if names[int(cls)] != "person": continue
+            area = (xyxy[2] - xyxy[0]) * (xyxy[3] - xyxy[1])
+            if area > best_area: best, best_area = xyxy, area
+        return best
+    except Exception:
+        return None
+
+def head_roi(pose_result, person_box, shape, pad=ROI_PADDING):
+    h, w = shape[:2]
+    if pose_result and pose_result.pose_landmarks:
+        lm = pose_result.pose_landmarks.landmark
+        nose = lm[mp_pose.PoseLandmark.NOSE.value]
+        if nose.visibility > 0.5:
+            l_ear, r_ear = lm[mp_pose.PoseLandmark.LEFT_EAR.value], lm[mp_pose.PoseLandmark.RIGHT_EAR.value]
+            half = max(abs(l_ear.x - r_ear.x) * w, MIN_ROI_SIZE / 2)
+            cx, cy = nose.x * w, nose.y * h
+            return expand_box((cx - half, cy - half * 1.2, cx + half, cy + half), pad, shape)
+    if person_box:
+        x0, y0, x1, y1 = person_box
+        return expand_box((x0, y0, x1, y0 + (y1 - y0) * 0.4), pad, shape)
+    return None
+
+def hands_roi(pose_result, person_box, shape, pad=ROI_PADDING):
+    h, w = shape[:2]
+    if pose_result and pose_result.pose_landmarks:
+        lm = pose_result.pose_landmarks.landmark
+        idx = (mp_pose.PoseLandmark.LEFT_WRIST, mp_pose.PoseLandmark.RIGHT_WRIST,
+               mp_pose.PoseLandmark.LEFT_INDEX, mp_pose.PoseLandmark.RIGHT_INDEX)
+        pts = [lm[i.value] for i in idx if lm[i.value].visibility > 0.3]
+        if pts:
+            xs, ys = [p.x * w for p in pts], [p.y * h for p in pts]
+            l_sh, r_sh = lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value], lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
+            reach = max(abs(l_sh.x - r_sh.x) * w * 0.6, MIN_ROI_SIZE)
+            return expand_box((min(xs) - reach, min(ys) - reach, max(xs) + reach, max(ys) + reach), pad, shape)
+    if person_box:
+        x0, y0, x1, y1 = person_box
+        return expand_box((x0, y0 + (y1 - y0) * 0.3, x1, y1), pad, shape)
+    return None
+
+def crop(frame, roi):
+    x0, y0, x1, y1 = roi
+    # MediaPipe needs a contiguous buffer; a plain slice is a strided view
+    return np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+def _landmark_lists(name, result):
+    if name == "pose": return [result.pose_landmarks] if result.pose_landmarks else []
+    if name == "face": return result.multi_face_landmarks or []
+    return result.multi_hand_landmarks or []
+
+def map_to_frame(name, result, roi, shape):
+    # Rewrites normalized crop coordinates in place as normalized full-frame ones
+    h, w = shape[:2]
+    x0, y0, x1, y1 = roi
+    sx, sy = (x1 - x0) / w, (y1 - y0) / h
+    ox, oy = x0 / w, y0 / h
+    for landmark_list in _landmark_lists(name, result):
+        for p in landmark_list.landmark:
+            p.x = ox + p.x * sx
+            p.y = oy + p.y * sy
+            p.z = p.z * sx
+
+# --- PROCESS-POOL WORKERS ---
+# Each MediaPipe solution gets its own single-process pool so its tracking state
+# stays in one place. Results are flattened to picklable namespaces because the
+# SolutionOutputs type MediaPipe returns can't cross a process boundary.
+_proc_solution = None
+
+def _proc_init(name):
+    global _proc_solution
+    _proc_solution = SOLUTION_BUILDERS[name]()
+
+def _picklable(name, result):
+    if name == "pose":
+        return SimpleNamespace(pose_landmarks=result.pose_landmarks)
+    if name == "face":
+        return SimpleNamespace(multi_face_landmarks=result.multi_face_landmarks)
+    return SimpleNamespace(multi_hand_landmarks=result.multi_hand_landmarks,
+                           multi_handedness=result.multi_handedness)
+
+def _proc_run(name, frame_rgb):
+    start = time.perf_counter()
+    result = _proc_solution.process(frame_rgb)
+    return _picklable(name, result), time.perf_counter() - start
+
+# --- SHARED YOLO BATCHER ---
+# With several seats in one process, every seat's YOLO request goes through one
+# thread that waits up to `window` seconds for other seats' frames and runs them
+# as a single batched predict() call. It also means the shared model is only
+# ever called from one thread.
+class YoloBatcher:
+    def __init__(self, model, yolo_kwargs=None, max_batch=8, window=0.005):
+        self.model = model
+        self.yolo_kwargs = yolo_kwargs or {}
+        self.max_batch = max_batch
+        self.window = window
+        self.cond = threading.Condition()
+        self.pending = []
+        self.stopped = False
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def submit(self, frame_bgr):
+        future = Future()
+        with self.cond:
+            self.pending.append((frame_bgr, future))
+            self.cond.notify()
+        return future
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.stopped)
+                if self.stopped: return
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.cond.wait(remaining): break
+                batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+
+            try:
+                results = self.model([frame for frame, _ in batch], verbose=False, **self.yolo_kwargs)
+            except Exception:
+                results = [None] * len(batch)
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future), result in zip(batch, results):
+                # Same shape as model(frame): a one-element list of Results
+                future.set_result([result] if result is not None else None)
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+# --- DETECTOR POOL ---
+class DetectorPool:
+    # mode: "thread" runs the four detectors concurrently on a thread pool,
+    # "process" moves the MediaPipe solutions into worker processes (YOLO stays
+    # on a thread, torch releases the GIL anyway), "serial" runs them one by one.
+    def __init__(self, model, mode="thread", yolo_kwargs=None, batcher=None):
+        self.model = model
+        # Extra predict() arguments, e.g. imgsz and the class filter
+        self.yolo_kwargs = yolo_kwargs or {}
+        # Multi-seat: YOLO goes through the shared YoloBatcher instead of self.model
+        self.batcher = batcher
+        self.mode = mode
+        self.timings = {}
+        self.solutions = {}
+        self.procs = {}
+
+        if mode == "process":
+            for name in SOLUTION_BUILDERS:
+                self.procs[name] = ProcessPoolExecutor(max_workers=1, initializer=_proc_init, initargs=(name,))
+        else:
+            for name, build in SOLUTION_BUILDERS.items():
+                self.solutions[name] = build()
+
+        self.threads = None
+        if mode != "serial":
+            self.threads = ThreadPoolExecutor(max_workers=len(DETECTORS), thread_name_prefix="detector")
+
+    def _run_yolo(self, frame_bgr):
+        start = time.perf_counter()
+        try:
+            if self.batcher: result = self.batcher.submit(frame_bgr).result()
+            else: result = self.model(frame_bgr, verbose=False, **self.yolo_kwargs)
+        except Exception: result = None
+        return result, time.perf_counter() - start
+
+    def _run_solution(self, name, frame_rgb):
+        start = time.perf_counter()
+        result = self.solutions[name].process(frame_rgb)
+        return result, time.perf_counter() - start
+
+    def run(self, frame_bgr, frame_rgb, which=DETECTORS, rois=None):
+        # Runs the requested detectors on the same frame and joins the results.
+        # rois maps a landmark detector to a pixel (x0, y0, x1, y1) crop to run on.
+        # Returns {name: result}; per-model seconds are left in self.timings.
+        start = time.perf_counter()
+        rois = {name: roi for name, roi in (rois or {}).items() if roi and name in which}
+        results = {}
+        futures = {}
+        for name in which:
+            image = crop(frame_rgb, rois[name]) if name in rois else frame_rgb
+            if name == "yolo":
+                fn, args = self._run_yolo, (frame_bgr,)
+            elif name in self.procs:
+                futures[name] = self.procs[name].submit(_proc_run, name, image)
+                continue
+            else:
+                fn, args = self._run_solution, (name, image)
+
+            if self.threads: futures[name] = self.threads.submit(fn, *args)
+            else: results[name], self.timings[name] = fn(*args)
+
+        for name, future in futures.items():
+            results[name], self.timings[name] = future.result()
+        for name, roi in rois.items():
+            if results.get(name) is not None: map_to_frame(name, results[name], roi, frame_rgb.shape)
+        self.timings["total"] = time.perf_counter() - start
+        return results
+
+    def warm_up(self, shape=(480, 640, 3)):
+        # One pass of every landmark model on a blank frame, so graph setup isn't
+        # billed to the first analysis tick. YOLO is warmed once, when it is loaded.
+        blank = np.zeros(shape, dtype=np.uint8)
+        self.run(blank, blank, [name for name in DETECTORS if name != "yolo"])
+
+    def shutdown(self):
+        if self.threads: self.threads.shutdown(wait=False)
+        for pool in self.procs.values(): pool.shutdown(wait=False)
@@ -0,0 +1,145 @@
+import datetime
+import gzip
+import os
+import shutil
+import threading
+import time
+
+# --- BUFFERED EVENT LOG ---
+# Status transitions are appended to an in-memory buffer and written to
+# logs/current_log.csv by a background thread, either every flush_interval
+# seconds or as soon as flush_size rows are waiting. The current file is always
+# plain CSV (append-only, readable after a crash); when it is rotated it becomes
+# archive_log_<timestamp>.<ext> in one of the archive formats below.
+#
+# fsync:           "never"  - leave it to the OS
+#                  "flush"  - fsync after every batch (default)
+#                  "always" - write + fsync every event as soon as it arrives
+# archive_format:  "csv", "csv.gz" or "parquet" (columnar, via polars)
+
+# Reason is only filled in for "Distracted" rows (Slouching / Looking Away / Idle)
+LOG_HEADER = "Timestamp,Status,Study,Phone,Desk,Slouch,Distracted,Reason"
+
+class EventLogWriter:
+    def __init__(self, folder, filename="current_log.csv", header=LOG_HEADER,
+                 flush_interval=2.0, flush_size=64, fsync="flush",
+                 max_bytes=5 * 1024 * 1024, max_age=None, archive_format="csv"):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self.header = header
+        self.flush_interval = flush_interval
+        self.flush_size = 1 if fsync == "always" else flush_size
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.archive_format = archive_format
+
+        self.cond = threading.Condition()
+        self.buffer = []
+        self.io_lock = threading.Lock()   # serializes file writes between flush() and rotate()
+        self.file = None
+        self.opened_at = None
+        self.stopped = False
+        self.last_flush = time.time()
+        self.written = 0
+
+        os.makedirs(folder, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def log(self, fields):
+        # Called from the frame loop / request threads: just a list append
+        line = ",".join(str(f) for f in fields)
+        with self.cond:
+            self.buffer.append(line)
+            if len(self.buffer) >= self.flush_size: self.cond.notify()
+
+    def lag(self):
+        # Rows accepted but not yet on disk, and seconds since the last flush
+        return len(self.buffer), time.time() - self.last_flush
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.buffer) >= self.flush_size or self.stopped,
+                                   timeout=self.flush_interval)
+                stopped = self.stopped
+            self.flush()
+            if stopped: return
+
+    def _open(self):
+        # A current log left over from an older version with different columns is
+        # archived as-is rather than appended to
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path) as f:
+                if f.readline().rstrip("\n") != self.header: self._rotate_locked()
+        need_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, "a")
+        self.opened_at = time.time()
+        if need_header: self.file.write(self.header + "\n")
+
+    def flush(self):
+        with self.cond:
+            rows, self.buffer = self.buffer, []
+        with self.io_lock:
+            if rows:
+                try:
+                    if self.file is None: self._open()
+                    self.file.write("\n".join(rows) + "\n")
+                    self.file.flush()
+                    if self.fsync != "never": os.fsync(self.file.fileno())
+                    self.written += len(rows)
+                except Exception as e:
+                    print(f"⚠️ Log error: {e}")
+                    # Keep the rows for the next attempt rather than dropping them
+                    with self.cond: self.buffer[:0] = rows
+            self.last_flush = time.time()
+            if self.file and self._due_for_rotation(): self._rotate_locked()
+
+    def _due_for_rotation(self):
+        if self.max_bytes and self.file.tell() >= self.max_bytes: return True
+        if self.max_age and time.time() - self.opened_at >= self.max_age: return True
+        return False
+
+    def rotate(self):
+        # Flush everything and move the current log into an archive
+        self.flush()
+        with self.io_lock:
+            self._rotate_locked()
+
+    def _rotate_locked(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if not os.path.exists(self.path): return
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        archive = os.path.join(self.folder, f"archive_log_{timestamp}.csv")
+        n = 1
+        # Size-based rotation can fire twice within a second; never overwrite an archive
+        while any(os.path.exists(archive[:-4] + ext) for ext in (".csv", ".csv.gz", ".parquet")):
+            archive = os.path.join(self.folder, f"archive_log_{timestamp}_{n}.csv")
+            n += 1
+        try:
+            os.replace(self.path, archive)
+            if self.archive_format == "csv.gz":
+                with open(archive, "rb") as src, gzip.open(archive + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(archive)
+            elif self.archive_format == "parquet":
+                import polars as pl
+                pl.read_csv(archive).write_parquet(archive[:-4] + ".parquet")
+                os.remove(archive)
+        except Exception as e:
+            print(f"⚠️ Log archive error: {e}")
+
+    def close(self):
+        # Clean shutdown: drain the buffer and close the file; safe to call twice
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        self.thread.join()
+        self.flush()
+        with self.io_lock:
+            if self.file:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import re
+import struct
+import sys
+import time
+from urllib.parse import urlsplit, parse_qs
+
+# --- LOCAL ADAFRUIT IO STAND-IN ---
+# A single-process fake of the parts of Adafruit IO this project touches, for
+# offline runs and load tests (see loadgen.py):
+#
+#   REST  POST /api/v2/<user>/feeds/<feed>/data        (Adafruit_IO Client.send)
+#         GET  /api/v2/<user>/feeds/<feed>/data[/last] (latest values)
+#         GET  /api/v2/<user>/feeds                    (feeds seen so far)
+#   MQTT  3.1.1 CONNECT / PUBLISH (QoS 0-1) / SUBSCRIBE / UNSUBSCRIBE / PING,
+#         topics <user>/feeds/<feed> or <user>/f/<feed>, + and # wildcards
+#
+# Every value, whether it came in over REST or MQTT, is fanned out to the MQTT
+# subscribers of its feed - the path app.py -> devicestatus -> Photon takes.
+# Point the app at it with AIO_HOST = "localhost" and AIO_PORT = 8080 (REST) or
+# 1883 (MQTT); point the firmware's AIO_SERVER at this machine.
+#
+#   python fake_aio.py --http-port 8080 --mqtt-port 1883 [--key KEY] [--rate-limit 30]
+
+# MQTT control packet types
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+# Subscribers whose socket buffer grows past this are skipped (QoS 0 may drop)
+MAX_SUBSCRIBER_BUFFER = 256 * 1024
+FEED_HISTORY = 100
+
+# --- MQTT WIRE FORMAT (shared with loadgen.py) ---
+def encode_length(n):
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n: return bytes(out)
+
+def encode_str(s):
+    data = s.encode() if isinstance(s, str) else s
+    return struct.pack("!H", len(data)) + data
+
+def packet(kind, flags, body=b""):
+    return bytes([(kind << 4) | flags]) + encode_length(len(body)) + body
+
+def publish_packet(topic, payload, qos=0, packet_id=0):
+    body = encode_str(topic) + (struct.pack("!H", packet_id) if qos else b"") + payload
+    return packet(PUBLISH, qos << 1, body)
+
+async def read_packet(reader):
+    # Returns (type, flags, body); raises IncompleteReadError when the peer goes away
+    first = (await reader.readexactly(1))[0]
+    length, shift = 0, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80: break
+        shift += 7
+    return first >> 4, first & 0x0F, await reader.readexactly(length)
+
+def read_str(body, pos):
+    (n,) = struct.unpack_from("!H", body, pos)
+    return body[pos + 2:pos + 2 + n].decode(), pos + 2 + n
+
+def parse_publish(flags, body):
+    topic, pos = read_str(body, 0)
+    qos = (flags >> 1) & 0x03
+    packet_id = 0
+    if qos:
+        (packet_id,) = struct.unpack_from("!H", body, pos)
+        pos += 2
+    return topic, body[pos:], qos, packet_id
+
+def topic_matches(pattern, topic):
+    if pattern == topic: return True
+    p, t = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(p):
+        if part == "#": return True
+        if i >= len(t) or (part != "+" and part != t[i]): return False
+    return len(p) == len(t)
+
+FEED_TOPIC = re.compile(r"^([^/]+)/(?:feeds|f)/([^/]+)$")
+
+def canonical_topic(topic):
+    # Adafruit accepts <user>/f/<feed> as a short form of <user>/feeds/<feed>
+    m = FEED_TOPIC.match(topic)
+    return f"{m.group(1)}/feeds/{m.group(2)}" if m else topic
+
+class Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions = set()
+
+class FakeAio:
+    def __init__(self, key=None, rate_limit=None):
+        self.key = key                      # None: accept any key
+        self.rate_limit = rate_limit        # REST writes per user per minute, None: unlimited
+        self.feeds = {}                     # (user, feed) -> list of data records
+        self.ids = itertools.count(1)
+        self.exact = {}                     # topic -> set of sessions
+        self.wildcard = {}                  # pattern -> set of sessions
+        self.writes = {}                    # user -> recent REST write times
+        self.stats = {"rest_writes": 0, "mqtt_publishes": 0, "delivered": 0, "dropped": 0,
+                      "throttled": 0, "connections": 0}
+
+    # --- FEEDS ---
+    def store(self, user, feed, value):
+        record = {"id": str(next(self.ids)), "value": value, "feed_key": feed,
+                  "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        history = self.feeds.setdefault((user, feed), [])
+        history.append(record)
+        if len(history) > FEED_HISTORY: del history[0]
+        self.fan_out(f"{user}/feeds/{feed}", str(value).encode())
+        return record
+
+    def fan_out(self, topic, payload):
+        data = publish_packet(topic, payload)
+        targets = set(self.exact.get(topic, ()))
+        for pattern, sessions in self.wildcard.items():
+            if topic_matches(pattern, topic): targets |= sessions
+        for session in targets:
+            transport = session.writer.transport
+            if transport.is_closing() or transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                self.stats["dropped"] += 1
+                continue
+            session.writer.write(data)
+            self.stats["delivered"] += 1
+
+    def throttled(self, user):
+        if not self.rate_limit: return False
+        now = time.monotonic()
+        recent = [t for t in self.writes.get(user, []) if now - t < 60.0]
+        if len(recent) >= self.rate_limit:
+            self.writes[user] = recent
+            return True
+        recent.append(now)
+        self.writes[user] = recent
+        return False
+
+    # --- REST ---
+    async def handle_http(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line: break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""): break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                status, payload = self.route(method, target, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close": break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        if len(parts) < 4 or parts[:2] != ["api", "v2"]: return "404 Not Found", {"error": "not found"}
+        if self.key is not None and headers.get("x-aio-key") != self.key:
+            return "401 Unauthorized", {"error": "invalid API key"}
+        user, rest = parts[2], parts[3:]
+
+        if rest == ["feeds"] and method == "GET":
+            return "200 OK", [{"key": feed, "last_value": h[-1]["value"] if h else None}
+                              for (u, feed), h in self.feeds.items() if u == user]
+        if len(rest) >= 3 and rest[0] == "feeds" and rest[2] == "data":
+            feed = rest[1]
+            if method == "POST" and len(rest) == 3:
+                if self.throttled(user):
+                    self.stats["throttled"] += 1
+                    return "429 Too Many Requests", {"error": "request limit reached"}
+                try: value = json.loads(body or b"{}").get("value")
+                except ValueError: return "400 Bad Request", {"error": "invalid JSON"}
+                self.stats["rest_writes"] += 1
+                return "200 OK", self.store(user, feed, value)
+            history = self.feeds.get((user, feed))
+            if history is None: return "404 Not Found", {"error": "feed not found"}
+            if method == "GET" and rest[3:] == ["last"]: return "200 OK", history[-1]
+            if method == "GET" and len(rest) == 3:
+                limit = int(parse_qs(url.query).get("limit", [FEED_HISTORY])[0])
+                return "200 OK", list(reversed(history[-limit:]))
+        return "404 Not Found", {"error": "not found"}
+
+    # --- MQTT ---
+    async def handle_mqtt(self, reader, writer):
+        session = Session(writer)
+        try:
+            kind, _, body = await read_packet(reader)
+            if kind != CONNECT: return
+            if not self.accept_connect(session, body):
+                writer.write(packet(CONNACK, 0, b"\x00\x05"))
+                return
+            writer.write(packet(CONNACK, 0, b"\x00\x00"))
+            self.stats["connections"] += 1
+
+            while True:
+                kind, flags, body = await read_packet(reader)
+                if kind == PUBLISH:
+                    topic, payload, qos, packet_id = parse_publish(flags, body)
+                    if qos: writer.write(packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                    self.stats["mqtt_publishes"] += 1
+                    m = FEED_TOPIC.match(topic)
+                    if m: self.store(m.group(1), m.group(2), payload.decode(errors="replace"))
+                    else: self.fan_out(topic, payload)
+                elif kind == SUBSCRIBE:
+                    (packet_id,) = struct.unpack_from("!H", body, 0)
+                    pos, granted = 2, bytearray()
+                    while pos < len(body):
+                        topic, pos = read_str(body, pos)
+                        pos += 1    # requested QoS; everything is delivered at QoS 0
+                        self.subscribe(session, canonical_topic(topic))
+                        granted.append(0)
+                    writer.write(packet(SUBACK, 0, struct.pack("!H", packet_id) + bytes(granted)))
+                elif kind == UNSUBSCRIBE:
+                    (packet_id,) = struct.unpack_from("!H", body, 0)
+                    pos = 2
+                    while pos < len(body):
+                        topic, pos = read_str(body, pos)
+                        self.unsubscribe(session, canonical_topic(topic))
+                    writer.write(packet(UNSUBACK, 0, struct.pack("!H", packet_id)))
+                elif kind == PINGREQ:
+                    writer.write(packet(PINGRESP, 0))
+                elif kind == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            for topic in list(session.subscriptions): self.unsubscribe(session, topic)
+            writer.close()
+
+    def accept_connect(self, session, body):
+        _, pos = read_str(body, 0)                  # protocol name
+        flags = body[pos + 1]
+        pos += 4                                    # level, flags, keep-alive
+        session.client_id, pos = read_str(body, pos)
+        if flags & 0x04:                            # will topic + message
+            _, pos = read_str(body, pos)
+            _, pos = read_str(body, pos)
+        password = None
+        if flags & 0x80: _, pos = read_str(body, pos)
+        if flags & 0x40: password, pos = read_str(body, pos)
+        return self.key is None or password == self.key
+
+    def subscribe(self, session, topic):
+        table = self.wildcard if ("+" in topic or "#" in topic) else self.exact
+        table.setdefault(topic, set()).add(session)
+        session.subscriptions.add(topic)
+
+    def unsubscribe(self, session, topic):
+        for table in (self.exact, self.wildcard):
+            sessions = table.get(topic)
+            if sessions is None: continue
+            sessions.discard(session)
+            if not sessions: del table[topic]
+        session.subscriptions.discard(topic)
+
+    async def start(self, host="127.0.0.1", http_port=8080, mqtt_port=1883):
+        self.servers = [await asyncio.start_server(self.handle_http, host, http_port),
+                        await asyncio.start_server(self.handle_mqtt, host, mqtt_port)]
+        return self
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+async def serve(args):
+    fake = await FakeAio(args.key, args.rate_limit).start(args.host, args.http_port, args.mqtt_port)
+    print(f"✅ Fake Adafruit IO: REST http://{args.host}:{args.http_port}  MQTT {args.host}:{args.mqtt_port}")
+    while True:
+        await asyncio.sleep(10)
+        print(f"📊 {fake.stats}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Adafruit IO REST and MQTT APIs.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--mqtt-port", type=int, default=1883)
+    parser.add_argument("--key", default=None, help="require this AIO key (default: accept any)")
+    parser.add_argument("--rate-limit", type=int, default=None, help="REST writes per user per minute, like the real service")
+    args = parser.parse_args(argv)
+    try: asyncio.run(serve(args))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    sys.exit(main())
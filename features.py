@@ -0,0 +1,90 @@
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import numpy as np
+
+# --- LANDMARK FEATURES ---
+# Turns one tick's MediaPipe results into a TickFeatures record. Only the
+# landmarks the heuristics need are gathered (one pass per landmark list into a
+# NumPy array); gaze, posture and the per-hand Writing/Typing tests are then
+# plain array math over all eyes / hands at once. The same record feeds the
+# status decision, the logs and classifier training.
+
+# FaceMesh (refine_landmarks=True): outer corner, inner corner, iris centre
+RIGHT_EYE = (33, 133, 468)
+LEFT_EYE = (362, 263, 473)
+EYE_INDICES = RIGHT_EYE + LEFT_EYE
+
+# Pose: nose, left shoulder, right shoulder
+POSE_INDICES = (0, 11, 12)
+
+# Hands: wrist, thumb tip, index MCP, index tip, middle MCP, middle tip, pinky MCP
+HAND_INDICES = (0, 4, 5, 8, 9, 12, 17)
+WRIST, THUMB_TIP, INDEX_MCP, INDEX_TIP, MIDDLE_MCP, MIDDLE_TIP, PINKY_MCP = range(7)
+
+# Hand heuristics (normalized image units)
+PINCH_THRESHOLD = 0.04      # thumb-index distance that counts as holding a pen
+TYPING_WRIST_Y = 0.4        # wrists below this line are resting on the desk
+
+@dataclass
+class TickFeatures:
+    gaze_score: Optional[float] = None      # 0 = looking hard left, 1 = hard right
+    posture_dist: Optional[float] = None    # shoulder y - nose y; small = slouching
+    pinch_dist: Optional[float] = None      # smallest thumb-index distance over all hands
+    hands_count: int = 0
+    writing: bool = False
+    typing: bool = False
+
+    @property
+    def hand_action(self):
+        if self.writing: return "Writing"
+        if self.typing: return "Typing"
+        return "None"
+
+    def as_dict(self):
+        return asdict(self)
+
+def gather(landmark_list, indices):
+    # (len(indices), 2) float32 array of x, y
+    lm = landmark_list.landmark
+    return np.array([(lm[i].x, lm[i].y) for i in indices], dtype=np.float32)
+
+def gaze_score(eyes):
+    # eyes: (2, 3, 2) = [right, left] x [outer, inner, iris] x [x, y]
+    width = np.linalg.norm(eyes[:, 1] - eyes[:, 0], axis=-1)
+    to_outer = np.linalg.norm(eyes[:, 2] - eyes[:, 0], axis=-1)
+    ratio = np.divide(to_outer, width, out=np.full_like(width, 0.5), where=width != 0)
+    return float(ratio.mean())
+
+def posture_dist(pose_pts):
+    return float(pose_pts[1:, 1].mean() - pose_pts[0, 1])
+
+def hand_actions(hands):
+    # hands: (n, 7, 2). Returns per-hand pinch distance, writing and typing flags
+    pinch = np.linalg.norm(hands[:, THUMB_TIP] - hands[:, INDEX_TIP], axis=-1)
+    y = hands[:, :, 1]
+    typing = ((y[:, WRIST] > TYPING_WRIST_Y)
+              & (y[:, INDEX_MCP] < y[:, WRIST]) & (y[:, PINKY_MCP] < y[:, WRIST])
+              & (y[:, INDEX_TIP] > y[:, INDEX_MCP]) & (y[:, MIDDLE_TIP] > y[:, MIDDLE_MCP]))
+    return pinch, pinch < PINCH_THRESHOLD, typing
+
+def extract_features(pose_result=None, face_result=None, hands_result=None):
+    features = TickFeatures()
+
+    if pose_result is not None and pose_result.pose_landmarks:
+        features.posture_dist = posture_dist(gather(pose_result.pose_landmarks, POSE_INDICES))
+
+    if face_result is not None and face_result.multi_face_landmarks:
+        eyes = gather(face_result.multi_face_landmarks[0], EYE_INDICES).reshape(2, 3, 2)
+        features.gaze_score = gaze_score(eyes)
+
+    if hands_result is not None and hands_result.multi_hand_landmarks:
+        hands = np.stack([gather(h, HAND_INDICES) for h in hands_result.multi_hand_landmarks])
+        pinch, writing, typing = hand_actions(hands)
+        features.hands_count = len(hands)
+        features.pinch_dist = float(pinch.min())
+        # Any pinching hand means Writing, which beats Typing from the other hand
+        features.writing = bool(writing.any())
+        features.typing = bool(typing.any())
+
+    return features
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# --- FRAME SOURCES ---
+# Anything the analysis pipeline can read frames from. A source spec is:
+#   0, 1, "0"            - webcam index (falls back to index 1 like before)
+#   "clip.mp4"           - a recorded video file
+#   "frames/"            - a directory of images, played in name order
+#   "synthetic[:WxH]"    - generated frames, no hardware or files needed
+# Every source has the cv2.VideoCapture subset we use: read(image=None),
+# isOpened(), release(), plus fps and rewind() so recordings can be looped.
+# read() decodes into `image` when it is given and has the right shape, which
+# lets CameraStream reuse a fixed ring of buffers instead of allocating a frame
+# per capture.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+class VideoCaptureSource:
+    def __init__(self, spec):
+        self.is_camera = isinstance(spec, int)
+        if self.is_camera:
+            self.cap = cv2.VideoCapture(spec)
+            if not self.cap.isOpened() and spec == 0: self.cap = cv2.VideoCapture(1)
+            # Optimize camera settings
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            self.cap.set(cv2.CAP_PROP_FPS, 30)
+        else:
+            self.cap = cv2.VideoCapture(spec)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self, image=None): return self.cap.read(image) if image is not None else self.cap.read()
+    def isOpened(self): return self.cap.isOpened()
+    def rewind(self): self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    def release(self): self.cap.release()
+
+class ImageDirSource:
+    def __init__(self, folder, fps=30.0):
+        self.paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.fps = fps
+        self.index = 0
+
+    def read(self, image=None):
+        # imread always allocates; the new array simply takes the ring slot's place
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None: return True, frame
+        return False, None
+
+    def isOpened(self): return bool(self.paths)
+    def rewind(self): self.index = 0
+    def release(self): pass
+
+class SyntheticSource:
+    # A bright block drifting over a noisy background: cheap to make, and it keeps
+    # the motion gate and JPEG encoder honest (a flat frame would flatter both)
+    def __init__(self, width=640, height=480, fps=30.0, frames=None):
+        self.width, self.height, self.fps = width, height, fps
+        self.frames = frames
+        self.index = 0
+        self.background = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def read(self, image=None):
+        if self.frames is not None and self.index >= self.frames: return False, None
+        frame = image if image is not None and image.shape == self.background.shape else np.empty_like(self.background)
+        np.copyto(frame, self.background)
+        x = (self.index * 4) % max(1, self.width - 100)
+        cv2.rectangle(frame, (x, self.height // 3), (x + 100, self.height // 3 + 100), (255, 255, 255), -1)
+        self.index += 1
+        return True, frame
+
+    def isOpened(self): return True
+    def rewind(self): self.index = 0
+    def release(self): pass
+
+def open_source(spec):
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return VideoCaptureSource(int(spec))
+    if spec.startswith("synthetic"):
+        if ":" in spec:
+            w, h = spec.split(":", 1)[1].lower().split("x")
+            return SyntheticSource(int(w), int(h))
+        return SyntheticSource()
+    if os.path.isdir(spec): return ImageDirSource(spec)
+    return VideoCaptureSource(spec)
+
+# --- THREADED CAMERA CLASS ---
+class CameraStream:
+    # Reads a source on its own thread. Recorded sources are paced to their fps
+    # (and optionally looped) so they behave like a live camera.
+    #
+    # Frames are decoded into a ring of `ring_size` preallocated buffers. A
+    # consumer that passes lease=True to wait_for_frame() keeps that buffer out
+    # of rotation until it calls release(seq), so it can work on (and draw into)
+    # the frame without copying it. The writer always refills the oldest free
+    # buffer, never the newest frame or a leased one.
+    def __init__(self, source=0, loop=True, ring_size=5):
+        self.stream = open_source(source)
+        self.live = getattr(self.stream, "is_camera", False)
+        self.loop = loop
+
+        # Consumers block on this condition until frame_seq moves past what they last saw
+        self.cond = threading.Condition()
+        self.frame_seq = 0
+        self.frame_time = 0.0
+        self.buffers = [None] * ring_size
+        self.slot_seq = [0] * ring_size     # which frame each buffer holds
+        self.leases = [0] * ring_size
+        self.latest_slot = None
+
+        (self.grabbed, self.frame) = self.stream.read()
+        if self.grabbed:
+            self.frame_seq = 1
+            self.frame_time = time.time()
+            self.buffers[0], self.slot_seq[0], self.latest_slot = self.frame, 1, 0
+        self.stopped = False
+
+    def _free_slot(self):
+        # Oldest buffer that is neither the newest frame nor leased (call with cond held)
+        n = len(self.buffers)
+        start = self.latest_slot if self.latest_slot is not None else -1
+        for k in range(1, n + 1):
+            i = (start + k) % n
+            if i != self.latest_slot and not self.leases[i]: return i
+        return None
+
+    def start(self):
+        threading.Thread(target=self.update, args=(), daemon=True).start()
+        return self
+
+    def update(self):
+        next_frame_at = time.time()
+        while True:
+            if self.stopped:
+                return
+            if not self.live:
+                next_frame_at += 1.0 / self.stream.fps
+                time.sleep(max(0.0, next_frame_at - time.time()))
+            with self.cond: slot = self._free_slot()
+            target = self.buffers[slot] if slot is not None else None
+            (grabbed, frame) = self.stream.read(target)
+            if not grabbed:
+                if not self.live and self.loop: self.stream.rewind()
+                # Don't spin on a dead/unplugged camera
+                time.sleep(0.05)
+                next_frame_at = time.time()
+                continue
+            with self.cond:
+                self.grabbed, self.frame = grabbed, frame
+                self.frame_time = time.time()
+                self.frame_seq += 1
+                # The source may have allocated instead (first frame, size change, imread)
+                if slot is not None: self.buffers[slot], self.slot_seq[slot] = frame, self.frame_seq
+                self.latest_slot = slot
+                self.cond.notify_all()
+
+    def read(self):
+        return self.frame
+
+    def wait_for_frame(self, last_seq, timeout=1.0, lease=False):
+        # Returns (seq, frame, capture_time) for the first frame newer than last_seq,
+        # or None if nothing new arrived within timeout. With lease=True the frame's
+        # buffer is not reused until release(seq).
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.frame_seq != last_seq or self.stopped, timeout=timeout):
+                return None
+            if self.stopped: return None
+            if lease and self.latest_slot is not None: self.leases[self.latest_slot] += 1
+            return self.frame_seq, self.frame, self.frame_time
+
+    def release(self, seq):
+        with self.cond:
+            for i, held in enumerate(self.slot_seq):
+                if held == seq and self.leases[i]:
+                    self.leases[i] -= 1
+                    return
+
+    def stop(self):
+        self.stopped = True
+        with self.cond:
+            self.cond.notify_all()
+        self.stream.release()
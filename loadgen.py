@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import json
+import random
+import struct
+import sys
+import time
+
+from fake_aio import (FakeAio, CONNECT, CONNACK, PUBLISH, SUBSCRIBE, SUBACK, PINGREQ,
+                      packet, publish_packet, encode_str, read_packet, parse_publish)
+
+# --- STATUS FAN-OUT LOAD TEST ---
+# Simulates a building: --seats publishers each sending their status to their own
+# "seat<i>-devicestatus" feed (over REST like app.py's default transport, or
+# MQTT), and --subscribers MQTT clients each listening to one seat's feed like
+# the Photon firmware does. Every value carries its send time, so subscribers
+# measure end-to-end publish-to-delivery latency.
+#
+#   python loadgen.py --spawn --seats 300 --subscribers 300 --rate 1 --duration 30
+#   python loadgen.py --host broker.local --transport mqtt --seats 500
+#
+# --spawn runs fake_aio.FakeAio in the same process; otherwise any broker that
+# speaks the same APIs (the fake, a self-hosted one) can be targeted.
+
+STATUSES = ("Studying", "On Phone", "Distracted", "Away")
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+class Results:
+    def __init__(self):
+        self.published = 0
+        self.publish_errors = 0
+        self.throttled = 0
+        self.delivered = 0
+        self.latencies = []
+        self.expected = 0
+
+async def mqtt_connect(host, port, client_id, user, key):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = (encode_str("MQTT") + bytes([4, 0xC2]) + struct.pack("!H", 60)
+            + encode_str(client_id) + encode_str(user) + encode_str(key))
+    writer.write(packet(CONNECT, 0, body))
+    kind, _, ack = await read_packet(reader)
+    if kind != CONNACK or ack[1] != 0: raise ConnectionError(f"MQTT connect refused ({ack[1]})")
+    return reader, writer
+
+async def subscribe(args, index):
+    feed = f"seat{index % args.seats}-devicestatus"
+    reader, writer = await mqtt_connect(args.host, args.mqtt_port, f"sub-{index}", args.user, args.key)
+    writer.write(packet(SUBSCRIBE, 2, struct.pack("!H", 1) + encode_str(f"{args.user}/feeds/{feed}") + b"\x00"))
+    kind, _, _ = await read_packet(reader)
+    if kind != SUBACK: raise ConnectionError("MQTT subscribe failed")
+    return reader, writer
+
+async def subscriber(reader, writer, results, stop):
+    try:
+        while not stop.is_set():
+            try: kind, flags, body = await asyncio.wait_for(read_packet(reader), timeout=30)
+            except asyncio.TimeoutError:
+                writer.write(packet(PINGREQ, 0))
+                continue
+            if kind != PUBLISH: continue
+            _, payload, _, _ = parse_publish(flags, body)
+            sent_ns = int(payload.rsplit(b"@", 1)[1])
+            results.delivered += 1
+            results.latencies.append((time.monotonic_ns() - sent_ns) / 1e6)
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError, IndexError):
+        pass
+    finally:
+        writer.close()
+
+async def mqtt_publisher(args, index, results, stop):
+    reader, writer = await mqtt_connect(args.host, args.mqtt_port, f"seat-{index}", args.user, args.key)
+    topic = f"{args.user}/feeds/seat{index}-devicestatus"
+    # Drain PUBACKs/PINGRESPs so the socket never fills up
+    drain = asyncio.ensure_future(_discard(reader))
+    try:
+        await asyncio.sleep(random.random() / args.rate)
+        while not stop.is_set():
+            value = f"{random.choice(STATUSES)}@{time.monotonic_ns()}".encode()
+            writer.write(publish_packet(topic, value, qos=args.qos, packet_id=1 if args.qos else 0))
+            await writer.drain()
+            results.published += 1
+            results.expected += args.fanout[index]
+            await asyncio.sleep(1.0 / args.rate)
+    except ConnectionError:
+        results.publish_errors += 1
+    finally:
+        drain.cancel()
+        writer.close()
+
+async def _discard(reader):
+    try:
+        while True: await read_packet(reader)
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+        pass
+
+async def rest_publisher(args, index, results, stop):
+    # One keep-alive HTTP connection per seat, like the Adafruit_IO client's session
+    reader, writer = await asyncio.open_connection(args.host, args.http_port)
+    path = f"/api/v2/{args.user}/feeds/seat{index}-devicestatus/data"
+    try:
+        await asyncio.sleep(random.random() / args.rate)
+        while not stop.is_set():
+            body = json.dumps({"value": f"{random.choice(STATUSES)}@{time.monotonic_ns()}"}).encode()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {args.host}\r\nX-AIO-Key: {args.key}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""): break
+                if line.lower().startswith(b"content-length:"): length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            if status == 429: results.throttled += 1
+            elif status >= 300: results.publish_errors += 1
+            else:
+                results.published += 1
+                results.expected += args.fanout[index]
+            await asyncio.sleep(1.0 / args.rate)
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError, IndexError):
+        results.publish_errors += 1
+    finally:
+        writer.close()
+
+async def run(args):
+    fake = None
+    if args.spawn:
+        fake = await FakeAio().start(args.host, args.http_port, args.mqtt_port)
+    # How many subscribers listen to each seat's feed
+    args.fanout = [len(range(i, args.subscribers, args.seats)) for i in range(args.seats)]
+
+    results = Results()
+    stop = asyncio.Event()
+    # Every subscriber must be connected before the clock starts; the first failure aborts the run
+    try:
+        connections = await asyncio.gather(*(subscribe(args, i) for i in range(args.subscribers)))
+    except (OSError, asyncio.IncompleteReadError) as e:
+        if fake: await fake.close()
+        raise SystemExit(f"❌ Subscribers could not connect to {args.host}:{args.mqtt_port}: {e}")
+    subs = [asyncio.ensure_future(subscriber(reader, writer, results, stop)) for reader, writer in connections]
+
+    publisher = mqtt_publisher if args.transport == "mqtt" else rest_publisher
+    start = time.perf_counter()
+    pubs = [asyncio.ensure_future(publisher(args, i, results, stop)) for i in range(args.seats)]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*pubs, return_exceptions=True)
+    # Let in-flight values land before counting losses
+    await asyncio.sleep(1.0)
+    for task in subs: task.cancel()
+    await asyncio.gather(*subs, return_exceptions=True)
+    if fake: await fake.close()
+
+    lat = results.latencies
+    return {
+        "transport": args.transport, "seats": args.seats, "subscribers": args.subscribers,
+        "duration_s": round(elapsed, 2),
+        "published": results.published, "publish_errors": results.publish_errors, "throttled": results.throttled,
+        "publish_per_s": round(results.published / elapsed, 1),
+        "delivered": results.delivered, "expected": results.expected,
+        "delivered_per_s": round(results.delivered / elapsed, 1),
+        "loss_percent": round(100.0 * (1 - results.delivered / results.expected), 2) if results.expected else None,
+        "latency_ms": {f"p{p}": round(percentile(lat, p), 2) for p in (50, 95, 99)} if lat else None,
+        "latency_max_ms": round(max(lat), 2) if lat else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the status fan-out path against a (fake) Adafruit IO.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--mqtt-port", type=int, default=1883)
+    parser.add_argument("--user", default="loadtest")
+    parser.add_argument("--key", default="loadtest-key")
+    parser.add_argument("--transport", choices=("rest", "mqtt"), default="rest", help="how seats publish")
+    parser.add_argument("--qos", type=int, choices=(0, 1), default=1, help="MQTT publish QoS (MqttTransport uses 1)")
+    parser.add_argument("--seats", type=int, default=100)
+    parser.add_argument("--subscribers", type=int, default=100, help="MQTT subscribers, spread over the seats' feeds")
+    parser.add_argument("--rate", type=float, default=1.0, help="status updates per seat per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--spawn", action="store_true", help="run the fake broker in this process")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(f"\n📊 {report['seats']} seats ({report['transport']}) -> {report['subscribers']} subscribers, {report['duration_s']} s")
+    print(f"   published {report['published']} ({report['publish_per_s']}/s), errors {report['publish_errors']}, throttled {report['throttled']}")
+    print(f"   delivered {report['delivered']}/{report['expected']} ({report['delivered_per_s']}/s), loss {report['loss_percent']}%")
+    if report["latency_ms"]:
+        print("   latency p50/p95/p99: " + " / ".join(f"{v:.2f}" for v in report["latency_ms"].values())
+              + f" ms (max {report['latency_max_ms']:.2f})")
+    if args.json:
+        with open(args.json, "w") as f: json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
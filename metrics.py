@@ -0,0 +1,165 @@
+import collections
+import sys
+import threading
+import time
+
+# --- IN-PROCESS METRICS ---
+# A tiny Prometheus-compatible registry (counters, gauges, histograms, optional
+# labels) rendered in the text exposition format by Registry.render(). Gauges can
+# take a callback so values owned by other objects (queue depths, RSS, ...) are
+# read only when /metrics is scraped, costing nothing on the frame loop.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+class Gauge:
+    def __init__(self, fn=None):
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        value = self.value
+        if self.fn:
+            try: value = self.fn()
+            except Exception: return
+        if value is not None: yield name, labels, value
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]: i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{name}_bucket", labels + (("le", le),), cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+class Family:
+    # One metric name; each distinct label combination gets its own child
+    def __init__(self, kind, name, help_text, labelnames, factory):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames: self.children[()] = factory()
+
+    def labels(self, **values):
+        key = tuple(str(values[n]) for n in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.factory())
+        return child
+
+    # Unlabelled families proxy straight to their only child
+    def __getattr__(self, attr):
+        return getattr(self.children[()], attr)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            base = tuple(zip(self.labelnames, key))
+            for name, labels, value in child.samples(self.name, base):
+                label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+                lines.append(f"{name}{label_text} {value}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.families = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Family("counter", name, help_text, labelnames, Counter))
+
+    def gauge(self, name, help_text, fn=None, labelnames=()):
+        return self._add(Family("gauge", name, help_text, labelnames, lambda: Gauge(fn)))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, labelnames=()):
+        return self._add(Family("histogram", name, help_text, labelnames, lambda: Histogram(buckets)))
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def render(self):
+        lines = []
+        for family in self.families: lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+class RateMeter:
+    # Events per second over a sliding window, for human-friendly FPS gauges
+    def __init__(self, window=5.0):
+        self.window = window
+        self.events = collections.deque()
+        self.lock = threading.Lock()   # marked from the worker, read from request threads
+
+    def _trim(self, now):
+        while self.events and now - self.events[0] > self.window: self.events.popleft()
+
+    def mark(self):
+        now = time.monotonic()
+        with self.lock:
+            self.events.append(now)
+            self._trim(now)
+
+    def rate(self):
+        with self.lock:
+            self._trim(time.monotonic())
+            return len(self.events) / self.window
+
+# --- SAMPLING PROFILER ---
+# Samples one thread's Python stack every `interval` seconds via
+# sys._current_frames() and counts collapsed stacks ("a;b;c N", the format
+# flamegraph.pl and speedscope read). Costs nothing while not running.
+class SamplingProfiler:
+    def __init__(self, thread_ident, interval=0.005):
+        self.thread_ident = thread_ident
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+
+    def run(self, seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_ident)
+            if frame is None: break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common()) + "\n"
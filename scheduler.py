@@ -0,0 +1,116 @@
+# --- ADAPTIVE ANALYSIS SCHEDULER ---
+# Decides, per captured frame, which detectors should run. Each detector has its
+# own cadence relative to the target analysis rate, and all cadences are stretched
+# when the measured inference cost would exceed the CPU budget. Detectors that are
+# skipped keep their last cached result, so status decisions always have something
+# to work with. With nobody in the seat only YOLO is scheduled.
+
+import cv2
+
+# Relative rates: 1.0 = every analysis tick, 0.5 = every other tick, ...
+DEFAULT_RELATIVE_RATES = {"yolo": 1.0, "pose": 0.5, "face": 0.5, "hands": 1.0}
+
+class DetectorSchedule:
+    def __init__(self, name, relative_rate):
+        self.name = name
+        self.relative_rate = relative_rate
+        self.latency = None   # EMA of inference seconds
+        self.last_run = None
+
+class AdaptiveScheduler:
+    def __init__(self, target_rate=8.0, cpu_budget=1.0, relative_rates=None, smoothing=0.2,
+                 stable_face_slowdown=3.0, stable_gaze_delta=0.03):
+        # target_rate: analysis ticks per second we'd like for a rate-1.0 detector
+        # cpu_budget: CPU seconds per wall second all detectors together may use
+        self.target_rate = target_rate
+        self.cpu_budget = cpu_budget
+        self.smoothing = smoothing
+        self.stable_face_slowdown = stable_face_slowdown
+        self.stable_gaze_delta = stable_gaze_delta
+        rates = relative_rates or DEFAULT_RELATIVE_RATES
+        self.schedules = {name: DetectorSchedule(name, rate) for name, rate in rates.items()}
+        self.scale = 1.0
+        self.last_gaze = None
+        self.face_stable = False
+
+    def base_interval(self, sched):
+        return 1.0 / (self.target_rate * sched.relative_rate)
+
+    def interval(self, name):
+        sched = self.schedules[name]
+        interval = self.base_interval(sched) * self.scale
+        if name == "face" and self.face_stable: interval *= self.stable_face_slowdown
+        return interval
+
+    def record(self, timings, now):
+        # Feed back measured per-model seconds from DetectorPool.timings
+        for name, seconds in timings.items():
+            sched = self.schedules.get(name)
+            if sched is None: continue
+            sched.last_run = now
+            if sched.latency is None: sched.latency = seconds
+            else: sched.latency += self.smoothing * (seconds - sched.latency)
+
+        # CPU cost per second at the unscaled cadence; stretch every interval if over budget
+        cost = sum(s.latency / self.base_interval(s) for s in self.schedules.values() if s.latency)
+        self.scale = max(1.0, cost / self.cpu_budget) if self.cpu_budget > 0 else 1.0
+
+    def record_gaze(self, gaze_score):
+        if self.last_gaze is not None:
+            self.face_stable = abs(gaze_score - self.last_gaze) < self.stable_gaze_delta
+        self.last_gaze = gaze_score
+
+    def due(self, now, person_present=True):
+        # Returns the detectors whose interval has elapsed at time `now`
+        names = []
+        for name, sched in self.schedules.items():
+            # Landmark models only make sense once YOLO has seen someone in the seat
+            if name != "yolo" and not person_present: continue
+            if sched.last_run is None or now - sched.last_run >= self.interval(name):
+                names.append(name)
+        return names
+
+    def effective_rates(self):
+        return {name: round(1.0 / self.interval(name), 2) for name in self.schedules}
+
+# --- MOTION GATE ---
+# Cheap change detector in front of the analysis stage. Frames are shrunk to a
+# tiny grayscale thumbnail and compared with the last analyzed one; if the mean
+# absolute difference is below threshold the previous detections are reused.
+# A refresh is still forced every refresh_interval seconds so slow drift (lighting,
+# a phone sliding into view) can't be missed forever.
+class MotionGate:
+    def __init__(self, threshold=4.0, refresh_interval=5.0, size=(64, 48)):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.size = size
+        self.reference = None
+        self.small = self.gray = self.diff = None   # reused per-frame buffers
+        self.last_refresh = None
+        self.last_score = 0.0
+        self.skipped = 0
+        self.analyzed = 0
+        self.forced = 0
+
+    def changed(self, frame, now):
+        self.small = cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        gray = self.gray = cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+        if self.reference is None or now - self.last_refresh >= self.refresh_interval:
+            if self.reference is not None: self.forced += 1
+        else:
+            self.diff = cv2.absdiff(gray, self.reference, dst=self.diff)
+            self.last_score = float(self.diff.mean())
+            if self.last_score < self.threshold:
+                self.skipped += 1
+                return False
+
+        # Swap rather than copy: the old reference becomes next frame's grey buffer
+        self.reference, self.gray = gray, self.reference
+        self.last_refresh = now
+        self.analyzed += 1
+        return True
+
+    def counters(self):
+        return {"analyzed": self.analyzed, "skipped": self.skipped, "forced": self.forced,
+                "last_score": round(self.last_score, 2)}
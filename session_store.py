@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+
+# --- CRASH-SAFE SESSION STORE ---
+# The session is persisted as a snapshot (current_session_save.json) plus an
+# append-only journal of stats deltas next to it. The frame loop only hands over
+# its latest stats snapshot; a background thread wakes on each one and appends
+# a small delta line, flushed to the OS straight away, so a crashed or killed
+# process resumes exact to the last tick. The journal is fsynced every
+# flush_interval, which bounds what a power cut can lose, and every
+# compact_every lines it is folded into a fresh snapshot that replaces the old
+# one atomically (write temp file, fsync, rename).
+#
+# Every journal line carries a sequence number and the snapshot remembers the
+# last one it contains, so a crash at any point - mid-append, or between the
+# snapshot rename and the journal truncate - replays to exactly the last written
+# delta without double counting.
+
+NUMERIC_FIELDS = ("study_time", "phone_time", "desk_time", "slouch_time", "distracted_time", "away_time")
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class SessionStore:
+    def __init__(self, snapshot_path, flush_interval=1.0, compact_every=2000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+
+        self.lock = threading.Lock()       # guards only `latest`, so record() never waits on disk
+        self.io_lock = threading.Lock()    # guards the journal, snapshot and `persisted`
+        self.stop_event = threading.Event()
+        self.changed = threading.Event()   # set by record(); wakes the writer thread
+        self.latest = None      # newest stats handed over by the frame loop
+        self.persisted = None   # state already covered by snapshot + journal
+        self.seq = 0
+        self.journal_lines = 0
+        self.journal = None
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # --- called from the frame loop / request threads ---
+    def record(self, stats):
+        # O(1) hand-off of the tick's stats snapshot. Snapshots are never modified
+        # after publishing (see stats_store.py), so no copy is needed to diff against.
+        with self.lock:
+            self.latest = stats
+        self.changed.set()
+
+    def load(self, defaults):
+        # Snapshot + journal replay. Returns (stats, resumed?)
+        state = dict(defaults)
+        snap_seq = 0
+        resumed = False
+        try:
+            with open(self.snapshot_path) as f:
+                snap = json.load(f)
+            snap_seq = snap.pop("_seq", 0)
+            state.update(snap)
+            resumed = True
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Session snapshot unreadable ({e}); replaying journal only.")
+
+        seq = snap_seq
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try: entry = json.loads(line)
+                    except ValueError: break   # torn final line from a crash
+                    if entry["seq"] <= snap_seq: continue
+                    for key, delta in entry.get("d", {}).items():
+                        state[key] = state.get(key, 0.0) + delta
+                    state.update(entry.get("set", {}))
+                    seq = entry["seq"]
+                    resumed = True
+        except FileNotFoundError:
+            pass
+
+        with self.lock:
+            self.latest = dict(state)
+        with self.io_lock:
+            self.seq = seq
+            self.persisted = dict(state)
+            self._compact_locked()
+        return state, resumed
+
+    def checkpoint(self, stats):
+        # Synchronous snapshot, used on pause/new session
+        with self.lock:
+            self.latest = dict(stats)
+        with self.io_lock:
+            self._append_locked()
+            self._compact_locked()
+
+    def clear(self):
+        with self.lock:
+            self.latest = None
+        with self.io_lock:
+            self.persisted = None
+            self._close_journal()
+            for path in (self.snapshot_path, self.journal_path):
+                if os.path.exists(path): os.remove(path)
+
+    # --- writer thread ---
+    def run(self):
+        # One line per handed-over tick (ticks that arrive while a line is being
+        # written are coalesced into the next one); fsync on its own schedule
+        last_sync = time.monotonic()
+        while not self.stop_event.is_set():
+            self.changed.wait(self.flush_interval)
+            self.changed.clear()
+            with self.io_lock:
+                self._append_locked(sync=False)
+                if time.monotonic() - last_sync >= self.flush_interval:
+                    self._sync_locked()
+                    last_sync = time.monotonic()
+                if self.journal_lines >= self.compact_every: self._compact_locked()
+
+    def _sync_locked(self):
+        if self.journal is None: return
+        try: os.fsync(self.journal.fileno())
+        except Exception as e: print(f"⚠️ Save failed: {e}")
+
+    def _append_locked(self, sync=True):
+        with self.lock:
+            latest = self.latest
+        if latest is None: return
+        if self.persisted is None: self.persisted = {}
+        deltas = {}
+        for key in NUMERIC_FIELDS:
+            delta = latest.get(key, 0.0) - self.persisted.get(key, 0.0)
+            if delta: deltas[key] = delta
+        changed = {k: v for k, v in latest.items() if k not in NUMERIC_FIELDS and self.persisted.get(k) != v}
+        if not deltas and not changed: return
+
+        self.seq += 1
+        entry = {"seq": self.seq, "d": deltas}
+        if changed: entry["set"] = changed
+        try:
+            if self.journal is None: self.journal = open(self.journal_path, "a")
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            if sync: os.fsync(self.journal.fileno())
+            self.journal_lines += 1
+            self.persisted = latest
+        except Exception as e:
+            self.seq -= 1
+            print(f"⚠️ Save failed: {e}")
+
+    def _compact_locked(self):
+        if self.persisted is None: return
+        try:
+            _write_atomic(self.snapshot_path, dict(self.persisted, _seq=self.seq))
+            # Safe even if we crash right here: replay skips seq <= snapshot _seq
+            self._close_journal()
+            open(self.journal_path, "w").close()
+            self.journal_lines = 0
+        except Exception as e:
+            print(f"⚠️ Save failed: {e}")
+
+    def _close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def close(self):
+        self.stop_event.set()
+        self.changed.set()
+        self.thread.join()
+        with self.io_lock:
+            self._append_locked()
+            self._compact_locked()
+            self._close_journal()
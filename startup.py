@@ -0,0 +1,71 @@
+import threading
+import time
+
+# --- BACKGROUND STARTUP ---
+# Slow things (model loading, warm-up inference, opening cameras, connecting to
+# Adafruit IO) run as named components on their own threads, so Flask can serve
+# the page straight away. Consumers call get() to wait for a component;
+# /healthz and /readyz report the state of each one.
+
+class Component:
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.state = "pending"      # pending -> loading -> ready | failed
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self.done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"init-{self.name}", daemon=True).start()
+        return self
+
+    def run(self):
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            self.value = self.factory()
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"❌ {self.name} failed to start: {e}")
+        self.seconds = time.perf_counter() - start
+        self.done.set()
+
+    def get(self, timeout=None):
+        # Blocks until the component is loaded; raises if it failed or timed out
+        if not self.done.wait(timeout): raise TimeoutError(f"{self.name} still {self.state}")
+        if self.state == "failed": raise RuntimeError(f"{self.name} failed: {self.error}")
+        return self.value
+
+    def status(self):
+        out = {"state": self.state}
+        if self.seconds is not None: out["seconds"] = round(self.seconds, 3)
+        if self.error: out["error"] = self.error
+        return out
+
+class Startup:
+    def __init__(self):
+        self.components = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, factory, start=True):
+        component = Component(name, factory)
+        with self.lock: self.components[name] = component
+        return component.start() if start else component
+
+    def mark(self, name, state, error=None):
+        # For things that come up on a thread we don't own (e.g. a seat's camera)
+        with self.lock:
+            component = self.components.get(name) or self.components.setdefault(name, Component(name, None))
+        component.state, component.error = state, error
+        if state in ("ready", "failed"): component.done.set()
+
+    def status(self):
+        with self.lock: return {name: c.status() for name, c in self.components.items()}
+
+    def ready(self, names=None):
+        with self.lock:
+            return all(c.state == "ready" for name, c in self.components.items() if names is None or name in names)
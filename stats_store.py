@@ -0,0 +1,69 @@
+import threading
+from types import MappingProxyType
+
+# --- SEAT STATS STORE ---
+# One seat's dashboard numbers. The analysis worker is the only writer: it holds
+# `lock` for a whole tick, changes the working values with add()/set(), and
+# finishes the tick with commit(), which publishes a new read-only snapshot.
+# Readers (Flask request threads, SSE streams, the session journal) just take
+# snapshot(): publishing is a single attribute assignment, so reads never lock
+# and never see a half-updated tick.
+#
+# Session actions (new / resume) go through reset(), which takes the same lock,
+# so a swap always lands between two ticks - never in the middle of one, and
+# never into a dict the worker has already stopped looking at.
+#
+# The denominator of the uploaded percentages is kept as a running total, so
+# percentages() is O(1) instead of re-summing the fields.
+
+TOTAL_FIELDS = ("study_time", "phone_time", "distracted_time")
+
+class StatsStore:
+    def __init__(self, defaults):
+        self.defaults = dict(defaults)
+        # Re-entrant so a session action can call reset()/log() while holding it
+        self.lock = threading.RLock()
+        self.values = dict(defaults)    # writer's working copy; only touch with `lock` held
+        self.total = 0.0
+        self.version = 0
+        self.current = (0, MappingProxyType(dict(defaults)))
+        self._recount()
+
+    def _recount(self):
+        self.total = sum(self.values.get(key, 0.0) for key in TOTAL_FIELDS)
+
+    # --- readers, any thread ---
+    def snapshot(self):
+        return self.current[1]
+
+    def versioned(self):
+        # (version, snapshot) from the same publish
+        return self.current
+
+    # --- writer (caller holds `lock`) ---
+    def get(self, key):
+        return self.values[key]
+
+    def add(self, key, amount):
+        self.values[key] += amount
+        if key in TOTAL_FIELDS: self.total += amount
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def percentages(self):
+        # Whole percent of TOTAL_FIELDS time per field, or None before any has accrued
+        if self.total <= 0: return None
+        return {key: int(self.values[key] / self.total * 100) for key in TOTAL_FIELDS}
+
+    def commit(self):
+        self.version += 1
+        self.current = (self.version, MappingProxyType(dict(self.values)))
+        return self.current[1]
+
+    def reset(self, values=None):
+        # Start from defaults (new session) or from restored values (resume)
+        with self.lock:
+            self.values = dict(self.defaults, **(values or {}))
+            self._recount()
+            return self.commit()
@@ -0,0 +1,132 @@
+import math
+
+# --- STATUS SMOOTHING ---
+# Stops one missed detection from flipping the status (and with it a log line,
+# an Adafruit upload and an LED change on the Photon). Two layers, both O(1) per
+# analysis tick:
+#
+# 1. smooth(): every input signal goes through a time-aware exponential moving
+#    average, and is turned back into a yes/no with hysteresis - separate enter
+#    and exit thresholds - so a value hovering on a threshold doesn't chatter.
+# 2. debounce(): the status picked by the rule chain must win a majority of the
+#    last `window` ticks (fixed ring buffer with running counts) and persist for
+#    its minimum dwell time before it replaces the current status.
+
+class Ema:
+    def __init__(self, tau):
+        self.tau = tau          # seconds for the average to move ~63% towards a new level
+        self.value = None
+        self.last = None
+
+    def update(self, x, now):
+        if self.value is None or self.tau <= 0:
+            self.value = x
+        else:
+            alpha = 1.0 - math.exp(-max(0.0, now - self.last) / self.tau)
+            self.value += alpha * (x - self.value)
+        self.last = now
+        return self.value
+
+    def reset(self):
+        self.value = self.last = None
+
+class Hysteresis:
+    # on once value >= enter, off again only once value <= exit (enter > exit),
+    # or the mirror image when invert=True (on when value drops below enter)
+    def __init__(self, enter, exit, invert=False):
+        self.enter, self.exit, self.invert = enter, exit, invert
+        self.state = False
+
+    def update(self, value):
+        if value is None: return self.state
+        if self.invert: value, enter, exit = -value, -self.enter, -self.exit
+        else: enter, exit = self.enter, self.exit
+        if not self.state and value >= enter: self.state = True
+        elif self.state and value <= exit: self.state = False
+        return self.state
+
+class RingVote:
+    def __init__(self, size):
+        self.slots = [None] * size
+        self.index = 0
+        self.filled = 0
+        self.counts = {}
+
+    def push(self, item):
+        old = self.slots[self.index]
+        if old is not None: self.counts[old] -= 1
+        else: self.filled += 1
+        self.slots[self.index] = item
+        self.counts[item] = self.counts.get(item, 0) + 1
+        self.index = (self.index + 1) % len(self.slots)
+
+    def share(self, item):
+        return self.counts.get(item, 0) / self.filled if self.filled else 0.0
+
+class StatusFilter:
+    def __init__(self, slouch_threshold, gaze_left, gaze_right, slouch_margin=0.02, gaze_margin=0.03,
+                 tau=0.6, presence_tau=0.4, window=8, min_dwell=1.0, dwell_overrides=None):
+        self.emas = {name: Ema(presence_tau) for name in ("phone", "person", "study_obj", "hand_study")}
+        self.emas["gaze"] = Ema(tau)
+        self.emas["posture"] = Ema(tau)
+
+        # Presence signals are 0/1 going in; their EMA has to clear 0.6 to switch on, drop under 0.4 to switch off
+        self.presence = {name: Hysteresis(0.6, 0.4) for name in ("phone", "person", "study_obj", "hand_study")}
+        # The calibrated thresholds stay the entry points; the margin only delays the exit
+        self.slouch = Hysteresis(slouch_threshold, slouch_threshold + slouch_margin, invert=True)
+        self.gaze_low = Hysteresis(gaze_left, gaze_left + gaze_margin, invert=True)
+        self.gaze_high = Hysteresis(gaze_right, gaze_right - gaze_margin)
+
+        self.votes = RingVote(window)
+        self.min_dwell = min_dwell
+        # e.g. {"On Phone": 0.5}: react faster to the statuses that matter most
+        self.dwell_overrides = dwell_overrides or {}
+        self.status = None
+        self.candidate = None
+        self.candidate_since = None
+        self.transitions = 0
+
+    def smooth(self, now, phone, person, study_obj, hand_study, gaze=None, posture=None):
+        # Returns the filtered booleans the rule chain works from
+        out = {}
+        for name, raw in (("phone", phone), ("person", person), ("study_obj", study_obj), ("hand_study", hand_study)):
+            out[name] = self.presence[name].update(self.emas[name].update(1.0 if raw else 0.0, now))
+
+        # A missing landmark holds its last average through a dropout while the person
+        # is still there; once they've left, the average and its latch are forgotten
+        # so a stale slouch or glance can't keep the status off "Away"
+        if gaze is None and not out["person"]:
+            self.emas["gaze"].reset()
+            self.gaze_low.state = self.gaze_high.state = False
+        if posture is None and not out["person"]:
+            self.emas["posture"].reset()
+            self.slouch.state = False
+        gaze_avg = self.emas["gaze"].update(gaze, now) if gaze is not None else self.emas["gaze"].value
+        posture_avg = self.emas["posture"].update(posture, now) if posture is not None else self.emas["posture"].value
+        low, high = self.gaze_low.update(gaze_avg), self.gaze_high.update(gaze_avg)
+        out["looking_away"] = low or high
+        out["slouching"] = self.slouch.update(posture_avg)
+        out["gaze"], out["posture"] = gaze_avg, posture_avg
+        return out
+
+    def debounce(self, raw_status, now):
+        # Returns the committed status after voting and dwell time
+        self.votes.push(raw_status)
+        if self.status is None:
+            self.status = raw_status
+            return self.status
+
+        if raw_status != self.candidate:
+            self.candidate, self.candidate_since = raw_status, now
+        if self.candidate == self.status: return self.status
+
+        dwell = self.dwell_overrides.get(self.candidate, self.min_dwell)
+        if self.votes.share(self.candidate) > 0.5 and now - self.candidate_since >= dwell:
+            self.status = self.candidate
+            self.transitions += 1
+        return self.status
+
+    def reset(self, status=None):
+        # New session: keep the averages (the person is still there), forget the vote
+        self.votes = RingVote(len(self.votes.slots))
+        self.status, self.candidate, self.candidate_since = status, None, None
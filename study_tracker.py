@@ -1,8 +1,8 @@
 import cv2
 from ultralytics import YOLO
-from Adafruit_IO import Client, RequestError
 import sys
 import time
+from uploader import AioPublisher, RestTransport
 
 # --- 1. ADAFRUIT IO SETUP ---
 # ▼▼▼ PASTE YOUR KEY HERE ▼▼▼
@@ -11,7 +11,8 @@ AIO_KEY = "aio_yJPh16jIXSVawbRxwtmFN7cntNKr"
 # ▼▼▼ ----------------- ▼▼▼
 
 try:
-    aio = Client(AIO_USERNAME, AIO_KEY)
+    # Sends happen on a background thread, rate-limited to Adafruit IO's quota
+    aio_publisher = AioPublisher(RestTransport(AIO_USERNAME, AIO_KEY)).start()
     FEED_STATUS = "devicestatus"
     FEED_PERCENT_STUDY = "time-studying"
     FEED_PERCENT_PHONE = "time-phone"
@@ -19,7 +20,7 @@ try:
     FEED_AVG_STUDY = "avg-study-rate"
     FEED_AVG_PHONE = "avg-phone-rate"
     FEED_AVG_DESK = "avg-desk-rate"
-except RequestError:
+except Exception:
     print("❌ Failed to connect to Adafruit IO.")
     sys.exit()
 print("✅ Connected to Adafruit IO.")
@@ -100,12 +101,9 @@ while True:
         # 4. SEND STATUS (With Cooldown)
         if (current_status != last_sent_status_val) and (current_time - last_sent_status_time > STATUS_COOLDOWN):
             print(f"--- Status Changed: {current_status} ---")
-            try:
-                aio.send(FEED_STATUS, current_status)
-                last_sent_status_val = current_status
-                last_sent_status_time = current_time 
-            except Exception as e:
-                print(f"⚠️ Status Upload Skipped: {e}")
+            aio_publisher.publish(FEED_STATUS, current_status)
+            last_sent_status_val = current_status
+            last_sent_status_time = current_time 
 
         # 5. SEND STATS (Every 30 seconds)
         if current_time - last_sent_stats_time > STATS_UPLOAD_INTERVAL:
@@ -125,25 +123,17 @@ while True:
             
             print(f"Rates (m/hr): Study={int(rate_study)} | Phone={int(rate_phone)} | Desk={int(rate_desk)}")
 
-            try:
-                # We add sleeps to prevent "Burst" throttling
-                aio.send(FEED_AVG_STUDY, int(rate_study))
-                time.sleep(0.5) 
-                aio.send(FEED_AVG_PHONE, int(rate_phone))
-                time.sleep(0.5)
-                aio.send(FEED_AVG_DESK, int(rate_desk))
-                time.sleep(0.5)
-                
-                aio.send(FEED_PERCENT_STUDY, int(pct_study))
-                time.sleep(0.5)
-                aio.send(FEED_PERCENT_PHONE, int(pct_phone))
-                time.sleep(0.5)
-                aio.send(FEED_PERCENT_DESK, int(pct_desk))
-                
-                print("✅ Stats sent successfully.")
-                last_sent_stats_time = current_time
-            except Exception as e:
-                print(f"⚠️ Stats Upload Skipped: {e}")
+            # The publisher's token bucket spaces these out, no sleeps needed
+            aio_publisher.publish(FEED_AVG_STUDY, int(rate_study))
+            aio_publisher.publish(FEED_AVG_PHONE, int(rate_phone))
+            aio_publisher.publish(FEED_AVG_DESK, int(rate_desk))
+
+            aio_publisher.publish(FEED_PERCENT_STUDY, int(pct_study))
+            aio_publisher.publish(FEED_PERCENT_PHONE, int(pct_phone))
+            aio_publisher.publish(FEED_PERCENT_DESK, int(pct_desk))
+
+            print(f"✅ Stats queued ({aio_publisher.sent} sent, {aio_publisher.failed} failed so far).")
+            last_sent_stats_time = current_time
 
         annotated_frame = results[0].plot() 
         cv2.imshow("YOLOv8 Study Tracker", annotated_frame)
@@ -153,4 +143,5 @@ while True:
 
 cap.release()
 cv2.destroyAllWindows()
+aio_publisher.stop()
 print("Tracker stopped.")
\ No newline at end of file
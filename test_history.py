@@ -0,0 +1,36 @@
+import pytest
+
+from analytics import HistoryStore
+from event_log import EventLogWriter
+
+def totals(store):
+    store.ingest()
+    rows = store.totals()
+    return {kind: sum(row[kind] for row in rows) for kind in ("study", "phone", "distracted")}
+
+def test_closing_row_credits_final_stretch(tmp_path):
+    # The last transition of a session only counts once a later row carries the final counters
+    log = EventLogWriter(str(tmp_path))
+    log.log(["2026-01-05 10:00:00", "Studying", 0, 0, 0, 0, 0, ""])
+    log.log(["2026-01-05 10:20:00", "On Phone", 1200, 0, 0, 0, 0, ""])
+    log.log(["2026-01-05 11:00:00", "SESSION ENDED", 1200, 2400, 0, 0, 0, ""])
+    log.rotate()
+    log.close()
+    assert totals(HistoryStore(str(tmp_path))) == {"study": 1200, "phone": 2400, "distracted": 0}
+
+def test_history_matches_live_counters_after_new_session(tmp_path):
+    app = pytest.importorskip("app")
+    seat = app.Seat("t", None, str(tmp_path), str(tmp_path / "session.json"))
+    try:
+        seat.new_session()
+        with seat.stats.lock:
+            seat.stats.set("status", "On Phone")
+            seat.log("On Phone")
+            seat.stats.add("phone_time", 17.7)
+            seat.stats.commit()
+        live = seat.stats.snapshot()["phone_time"]
+        seat.new_session()
+        # The log stores whole seconds
+        assert totals(seat.history)["phone"] == int(live)
+    finally:
+        seat.stop()
@@ -0,0 +1,44 @@
+from status_filter import StatusFilter
+
+SLOUCH_THRESHOLD = 0.15
+GAZE_LEFT, GAZE_RIGHT = 0.35, 0.65
+
+def make_filter():
+    return StatusFilter(SLOUCH_THRESHOLD, GAZE_LEFT, GAZE_RIGHT)
+
+def test_slouch_latch_clears_when_person_leaves():
+    f = make_filter()
+    t = 0.0
+    # 5 s slouching at the desk
+    while t < 5.0:
+        out = f.smooth(t, False, True, False, False, gaze=0.5, posture=0.05)
+        t += 0.1
+    assert out["slouching"] and out["person"]
+
+    # Nobody there: no landmarks, no person box
+    while t < 10.0:
+        out = f.smooth(t, False, False, False, False, gaze=None, posture=None)
+        t += 0.1
+    assert not out["person"]
+    assert not out["slouching"]
+    assert not out["looking_away"]
+    assert out["posture"] is None
+
+def test_landmark_dropout_holds_while_person_present():
+    f = make_filter()
+    t = 0.0
+    while t < 5.0:
+        out = f.smooth(t, False, True, False, False, gaze=0.9, posture=0.3)
+        t += 0.1
+    assert out["looking_away"]
+    # Face missed for a few ticks, person still detected
+    for _ in range(3):
+        out = f.smooth(t, False, True, False, False, gaze=None, posture=0.3)
+        t += 0.1
+    assert out["looking_away"]
+
+def test_reset_forgets_vote():
+    f = make_filter()
+    assert f.debounce("Studying", 0.0) == "Studying"
+    f.reset()
+    assert f.debounce("Away", 1.0) == "Away"
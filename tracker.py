@@ -0,0 +1,195 @@
+import itertools
+
+import cv2
+import numpy as np
+
+# --- BOX TRACKER ---
+# YOLO only runs on keyframes. In between, every tracked box (person, phone,
+# book, ...) is moved by the median optical flow of a few corner points inside
+# it (pyramidal Lucas-Kanade on a half-size grey frame, one call for all
+# tracks), which costs around a millisecond instead of a full detection.
+#
+# On a keyframe the new detections are matched to existing tracks by IoU (same
+# class, greedy, highest overlap first) so track IDs survive across keyframes.
+# A track whose points are being lost, or that jumps further than a box can
+# plausibly move in one frame, marks the tracker uncertain; the worker then
+# runs YOLO early instead of waiting for the next keyframe. So does a burst of
+# motion around the person (a hand reaching for a phone): a newly picked-up
+# object has no track yet, and this is when one is most likely to appear.
+
+class Track:
+    def __init__(self, track_id, name, box, score):
+        self.id = track_id
+        self.name = name
+        self.box = np.asarray(box, dtype=np.float32)   # pixel x0, y0, x1, y1
+        self.score = score
+        self.points = None          # (n, 1, 2) corners in tracker (scaled) coordinates
+        self.confidence = 1.0       # fraction of seeded points still tracked
+        self.hits = 1
+        self.misses = 0
+
+def iou_matrix(a, b):
+    # (n, 4) x (m, 4) boxes -> (n, m) intersection over union
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+class BoxTracker:
+    def __init__(self, scale=0.5, iou_threshold=0.3, max_misses=2, max_points=30, min_points=5,
+                 min_confidence=0.5, max_jump=0.25, min_redetect_interval=0.15,
+                 activity_threshold=8.0, activity_margin=0.25, hold_misses=1):
+        self.scale = scale
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses            # keyframes a track may go undetected before it is dropped
+        self.max_points = max_points
+        self.min_points = min_points
+        self.min_confidence = min_confidence
+        self.max_jump = max_jump                # per-frame move, as a fraction of the box size
+        self.min_redetect_interval = min_redetect_interval
+        self.activity_threshold = activity_threshold    # mean grey-level change around the person
+        self.activity_margin = activity_margin          # box growth, as a fraction of its size, to include reaching hands
+        self.hold_misses = hold_misses                  # missed keyframes a track still counts as present
+        self.activity = 0.0
+        self.activity_triggers = 0
+        self.tracks = []
+        self.ids = itertools.count(1)
+        self.prev_gray = None
+        self.small = None               # reused resize target
+        self.spare_gray = None          # the grey buffer prev_gray isn't using
+        self.last_detection = None
+        self.uncertain = False
+        self.early_detections = 0
+
+    def _gray(self, frame):
+        # Writes into reused buffers; two grey frames alternate so prev_gray stays intact
+        h, w = frame.shape[:2]
+        self.small = cv2.resize(frame, (int(w * self.scale), int(h * self.scale)), dst=self.small, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.spare_gray)
+
+    def _advance(self, gray):
+        self.spare_gray, self.prev_gray = self.prev_gray, gray
+
+    def _seed(self, gray, track):
+        h, w = gray.shape
+        x0, y0, x1, y1 = (track.box * self.scale).astype(int)
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+        track.points, track.confidence = None, 1.0
+        if x1 - x0 < 4 or y1 - y0 < 4: return
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        track.points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 4, mask=mask)
+
+    def update(self, frame, boxes, names, scores, now):
+        # Keyframe: associate fresh detections (pixel xyxy) with the existing tracks
+        gray = self._gray(frame)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        matched_tracks, matched_dets = set(), set()
+
+        if self.tracks and len(boxes):
+            ious = iou_matrix(np.stack([t.box for t in self.tracks]), boxes)
+            for i, track in enumerate(self.tracks):
+                for j, name in enumerate(names):
+                    if name != track.name: ious[i, j] = 0.0
+            for i, j in zip(*np.unravel_index(np.argsort(-ious, axis=None), ious.shape)):
+                if ious[i, j] < self.iou_threshold: break
+                if i in matched_tracks or j in matched_dets: continue
+                track = self.tracks[i]
+                track.box, track.score = boxes[j].copy(), scores[j]
+                track.hits += 1
+                track.misses = 0
+                matched_tracks.add(i)
+                matched_dets.add(j)
+
+        kept = []
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks: track.misses += 1
+            if track.misses <= self.max_misses: kept.append(track)
+        for j in range(len(boxes)):
+            if j not in matched_dets: kept.append(Track(next(self.ids), names[j], boxes[j], scores[j]))
+        self.tracks = kept
+
+        for track in self.tracks: self._seed(gray, track)
+        self._advance(gray)
+        self.last_detection = now
+        self.uncertain = False
+
+    def propagate(self, frame):
+        # Non-keyframe: shift each box by the median flow of its points
+        if self.prev_gray is None or not self.tracks: return
+        gray = self._gray(frame)
+        # Tracks without corners (a plain dark phone, say) just coast until the next keyframe
+        seeded = [t for t in self.tracks if t.points is not None and len(t.points)]
+        uncertain = False
+
+        if seeded:
+            old = np.concatenate([t.points for t in seeded])
+            new, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, old, None, winSize=(15, 15), maxLevel=2)
+            status = status.reshape(-1).astype(bool)
+            start = 0
+            for track in seeded:
+                n = len(track.points)
+                ok = status[start:start + n]
+                p0, p1 = old[start:start + n].reshape(-1, 2), new[start:start + n].reshape(-1, 2)
+                start += n
+                if ok.sum() < self.min_points:
+                    track.points, track.confidence = None, 0.0
+                    uncertain = True
+                    continue
+                dx, dy = np.median(p1[ok] - p0[ok], axis=0) / self.scale
+                size = max(track.box[2] - track.box[0], track.box[3] - track.box[1], 1.0)
+                if np.hypot(dx, dy) > self.max_jump * size: uncertain = True
+                track.box += np.array([dx, dy, dx, dy], dtype=np.float32)
+                track.points = p1[ok].reshape(-1, 1, 2)
+                track.confidence *= ok.mean()
+                if track.confidence < self.min_confidence: uncertain = True
+
+        person = self._largest("person")
+        if person is not None:
+            self.activity = self._activity(gray, person.box)
+            if self.activity > self.activity_threshold:
+                self.activity_triggers += 1
+                uncertain = True
+
+        self._advance(gray)
+        self.uncertain = self.uncertain or uncertain
+
+    def needs_detection(self, now):
+        # True when the tracks can't be trusted and YOLO hasn't just run
+        if not self.uncertain or self.last_detection is None: return False
+        if now - self.last_detection < self.min_redetect_interval: return False
+        # Counts as an attempt even if the detection fails, so a broken model isn't retried every frame
+        self.last_detection = now
+        self.early_detections += 1
+        return True
+
+    def _activity(self, gray, box):
+        # Mean frame-to-frame change inside the (enlarged) box, on the scaled grey frames
+        h, w = gray.shape
+        x0, y0, x1, y1 = box * self.scale
+        mx, my = (x1 - x0) * self.activity_margin, (y1 - y0) * self.activity_margin
+        x0, y0 = max(0, int(x0 - mx)), max(0, int(y0 - my))
+        x1, y1 = min(w, int(x1 + mx)), min(h, int(y1 + my))
+        if x1 - x0 < 2 or y1 - y0 < 2: return 0.0
+        return float(cv2.absdiff(self.prev_gray[y0:y1, x0:x1], gray[y0:y1, x0:x1]).mean())
+
+    def _largest(self, name):
+        tracks = [t for t in self.tracks if t.name == name and t.misses == 0]
+        if not tracks: return None
+        return max(tracks, key=lambda t: (t.box[2] - t.box[0]) * (t.box[3] - t.box[1]))
+
+    def largest_box(self, name):
+        track = self._largest(name)
+        return track.box.tolist() if track is not None else None
+
+    def present_names(self):
+        # Classes with a live track; bridges a keyframe where YOLO briefly missed the object
+        return {t.name for t in self.tracks if t.misses <= self.hold_misses}
+
+    def counters(self):
+        return {"tracks": len(self.tracks), "early_detections": self.early_detections,
+                "activity": round(self.activity, 2), "activity_triggers": self.activity_triggers}
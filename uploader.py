@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --- ADAFRUIT IO PUBLISHER ---
+# Sends feed values from a background thread so a slow or dead network never
+# blocks the frame loop. Pending values are coalesced per feed (only the newest
+# value of each feed is ever sent), the send rate is held under Adafruit IO's
+# limit with a token bucket, and failed sends are retried with exponential backoff.
+#
+# The transport is anything with send(feed, value): RestTransport and
+# MqttTransport below, or a stub in tests. Both take a host/base_url so they can
+# be pointed at a local fake broker. A zero-argument callable that returns a
+# transport is also accepted; it is called on the publisher thread so creating
+# the client never delays startup.
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=30, burst=5):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+    def wait_time(self):
+        # Seconds until a token is available (0 if one is ready now)
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1: return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class RestTransport:
+    def __init__(self, username, key, base_url="https://io.adafruit.com"):
+        from Adafruit_IO import Client
+        self.client = Client(username, key, base_url=base_url)
+
+    def send(self, feed, value):
+        self.client.send(feed, value)
+
+    def close(self):
+        pass
+
+class MqttTransport:
+    # One persistent connection; paho reconnects on its own in the background
+    connects_async = True   # the connection is reported by on_connect, not at construction
+
+    def __init__(self, username, key, host="io.adafruit.com", port=1883):
+        import paho.mqtt.client as mqtt
+        self.mqtt = mqtt
+        self.username = username
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.client.username_pw_set(username, key)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        self.client.on_connect = self.on_connect
+        self.client.connect_async(host, port)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure: print(f"⚠️ Adafruit IO (MQTT) refused the connection: {reason_code}")
+        else: print("✅ Connected to Adafruit IO (MQTT).")
+
+    def send(self, feed, value):
+        # While disconnected, fail before publishing: a QoS 1 publish would be queued
+        # inside paho on every retry and all the copies delivered on reconnect,
+        # bypassing the publisher's coalescing and rate limit
+        if not self.client.is_connected(): raise ConnectionError("MQTT not connected")
+        info = self.client.publish(f"{self.username}/feeds/{feed}", str(value), qos=1)
+        # NO_CONN here means the link dropped after the check; paho has queued the
+        # message and will deliver it once, so it counts as sent
+        if info.rc not in (self.mqtt.MQTT_ERR_SUCCESS, self.mqtt.MQTT_ERR_NO_CONN):
+            raise ConnectionError(f"MQTT publish failed: {self.mqtt.error_string(info.rc)}")
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+class NullTransport:
+    # Accepts and forgets everything; for benchmarks and offline runs
+    def __init__(self):
+        self.values = {}
+
+    def send(self, feed, value):
+        self.values[feed] = value
+
+    def close(self):
+        pass
+
+def make_transport(kind, username, key, host=None, port=None):
+    if kind == "mqtt":
+        return MqttTransport(username, key, host=host or "io.adafruit.com", port=port or 1883)
+    base_url = f"http://{host}:{port}" if host else "https://io.adafruit.com"
+    return RestTransport(username, key, base_url=base_url)
+
+class AioPublisher:
+    def __init__(self, transport, max_pending=32, rate_per_minute=30, burst=5,
+                 max_retries=5, backoff=1.0, max_backoff=60.0):
+        self.transport = transport
+        self.max_pending = max_pending
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.cond = threading.Condition()
+        self.pending = OrderedDict()   # feed -> (value, attempts)
+        self.stopped = False
+        self.thread = None
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def publish(self, feed, value):
+        # Never blocks: replaces any unsent value for the same feed
+        with self.cond:
+            if feed in self.pending:
+                self.coalesced += 1
+                del self.pending[feed]
+            elif len(self.pending) >= self.max_pending:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[feed] = (value, 0)
+            self.cond.notify()
+
+    def queue_depth(self):
+        return len(self.pending)
+
+    def connect(self):
+        if hasattr(self.transport, "send"): return
+        try:
+            self.transport = self.transport()
+            if not getattr(self.transport, "connects_async", False): print("✅ Connected to Adafruit IO.")
+        except Exception as e:
+            # Keep tracking; values are accepted and discarded
+            self.last_error = str(e)
+            print(f"⚠️ Adafruit IO unavailable ({e}); uploads disabled.")
+            self.transport = NullTransport()
+
+    def run(self):
+        self.connect()
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.stopped)
+                if not self.pending: return
+                feed, (value, attempts) = self.pending.popitem(last=False)
+
+            wait = self.bucket.wait_time()
+            if wait > 0:
+                with self.cond:
+                    # Let stop() cut the wait short; the value is still sent before exiting
+                    self.cond.wait_for(lambda: self.stopped, timeout=wait)
+            self.bucket.take()
+
+            try:
+                self.transport.send(feed, value)
+                self.sent += 1
+            except Exception as e:
+                self.last_error = str(e)
+                self.retry(feed, value, attempts + 1)
+
+    def retry(self, feed, value, attempts):
+        if attempts > self.max_retries or self.stopped:
+            self.failed += 1
+            print(f"⚠️ Upload to '{feed}' failed after {attempts} attempts: {self.last_error}")
+            return
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempts - 1)))
+        with self.cond:
+            self.cond.wait_for(lambda: self.stopped, timeout=delay)
+            # A newer value may have been published while we backed off; it wins
+            if feed not in self.pending:
+                self.pending[feed] = (value, attempts)
+                self.pending.move_to_end(feed, last=False)
+
+    def stop(self, timeout=5.0):
+        # Flushes whatever is pending (one attempt each) and shuts the transport down
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.thread: self.thread.join(timeout)
+        if hasattr(self.transport, "close"): self.transport.close()
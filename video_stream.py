@@ -0,0 +1,130 @@
+import threading
+import time
+
+import cv2
+
+try:
+    import simplejpeg   # libjpeg-turbo; noticeably faster than cv2.imencode where available
+except ImportError:
+    simplejpeg = None
+
+# --- VIDEO DELIVERY ---
+# The analysis worker publishes each annotated frame once. JPEGs are encoded
+# lazily, at most once per frame per distinct output (width, quality), and
+# cached, so encode CPU scales with the variants being watched rather than with
+# the number of viewers - and with nobody watching, nothing is encoded at all.
+#
+# Viewers always take the newest frame: a slow client that is still busy sending
+# the previous JPEG simply skips the frames it missed instead of queueing them.
+#
+# Published frames may be borrowed buffers (see CameraStream's ring). Each one
+# is reference counted - one reference for being the newest frame, one per
+# viewer encoding it - and its `release` callback runs only once a newer frame
+# is out and the last viewer has finished with it.
+
+# Widths a client may ask for; requests snap down to one of these so a grid of
+# thumbnails shares one cached encode instead of one per odd size
+VIDEO_WIDTHS = (160, 320, 480, 640)
+MAX_VIEWER_FPS = 30.0
+
+def encode_jpeg(frame, quality=70):
+    if simplejpeg is not None:
+        try: return simplejpeg.encode_jpeg(frame, quality=quality, colorspace="BGR")
+        except Exception: pass
+    ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes() if ret else None
+
+def snap_width(width, frame_width):
+    if not width or width >= frame_width: return None
+    allowed = [w for w in VIDEO_WIDTHS if w <= width]
+    return allowed[-1] if allowed else VIDEO_WIDTHS[0]
+
+class FrameBroadcaster:
+    def __init__(self, quality=70, on_encode=None):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        self.quality = quality
+        self.on_encode = on_encode      # called with the seconds each encode took
+        self.variants = {}              # (width, quality) -> (seq, jpeg)
+        self.variant_locks = {}
+        self.encodes = 0
+        self.cache_hits = 0
+        self.viewers = 0                # open viewer() generators; the worker skips overlays at 0
+        self.holds = {}                 # seq -> [references, release callback]
+
+    def publish(self, frame, release=None):
+        # The frame must not be modified after this; viewers encode from it
+        with self.cond:
+            previous = self.seq
+            self.frame = frame
+            self.seq += 1
+            self.holds[self.seq] = [1, release]
+            self.cond.notify_all()
+            release = self._drop(previous)
+        if release: release()
+
+    def _drop(self, seq):
+        # Call with cond held; returns the release callback once the last reference is gone
+        hold = self.holds.get(seq)
+        if hold is None: return None
+        hold[0] -= 1
+        if hold[0]: return None
+        del self.holds[seq]
+        return hold[1]
+
+    def wait(self, last_seq, timeout=1.0, hold=False):
+        # Returns (seq, frame) for the newest frame after last_seq, or (last_seq, None) on timeout.
+        # With hold=True the frame stays referenced until done(seq).
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != last_seq, timeout=timeout):
+                return last_seq, None
+            if hold: self.holds[self.seq][0] += 1
+            return self.seq, self.frame
+
+    def done(self, seq):
+        with self.cond: release = self._drop(seq)
+        if release: release()
+
+    def jpeg(self, seq, frame, width=None, quality=None):
+        quality = quality or self.quality
+        width = snap_width(width, frame.shape[1])
+        key = (width, quality)
+        lock = self.variant_locks.get(key) or self.variant_locks.setdefault(key, threading.Lock())
+        # Viewers of the same variant wait for one encode instead of each doing their own
+        with lock:
+            cached = self.variants.get(key)
+            if cached and cached[0] >= seq:
+                self.cache_hits += 1
+                return cached[1]
+            start = time.perf_counter()
+            image = frame
+            if width:
+                height = int(round(frame.shape[0] * width / frame.shape[1]))
+                image = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            try: jpeg = encode_jpeg(image, quality)
+            except Exception: jpeg = None
+            if self.on_encode: self.on_encode(time.perf_counter() - start)
+            self.encodes += 1
+            if jpeg: self.variants[key] = (seq, jpeg)
+            return jpeg
+
+    def viewer(self, max_fps=None, width=None, quality=None):
+        # Generator of JPEG bytes for one client, newest frame first, at most max_fps
+        min_interval = 1.0 / min(max_fps or MAX_VIEWER_FPS, MAX_VIEWER_FPS)
+        last_seq, next_at = 0, 0.0
+        with self.cond: self.viewers += 1
+        try:
+            while True:
+                wait = next_at - time.monotonic()
+                if wait > 0: time.sleep(wait)
+                seq, frame = self.wait(last_seq, hold=True)
+                if frame is None: continue
+                last_seq = seq
+                next_at = time.monotonic() + min_interval
+                try: jpeg = self.jpeg(seq, frame, width, quality)
+                finally: self.done(seq)
+                if jpeg: yield jpeg
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            with self.cond: self.viewers -= 1